@@ -1,6 +1,10 @@
 import os
+import sys
 import curses
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from commit_helper.listing import list_directory, prefetch_near
+
 def display_menu(stdscr, current_selection, files_and_dirs, show_menu):
     stdscr.clear()
     if show_menu:
@@ -20,17 +24,19 @@ def handle_user_input(stdscr, key, current_selection, files_and_dirs, current_di
     elif key == curses.KEY_DOWN and current_selection < len(files_and_dirs) - 1:
         current_selection += 1
     elif key == curses.KEY_RIGHT:
-        potential_dir = os.path.join(current_directory, files_and_dirs[current_selection])
-        if os.path.isdir(potential_dir):
+        if list_directory(current_directory).is_dir(current_selection):
             directory_stack.append(current_directory)
-            current_directory = potential_dir
-            files_and_dirs = os.listdir(current_directory)
+            current_directory = os.path.join(current_directory, files_and_dirs[current_selection])
+            files_and_dirs = list_directory(current_directory).entries
             current_selection = 0
     elif key == curses.KEY_LEFT:
         if directory_stack:
             current_directory = directory_stack.pop()
-            files_and_dirs = os.listdir(current_directory)
+            files_and_dirs = list_directory(current_directory).entries
             current_selection = 0
+    if key in (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_RIGHT, curses.KEY_LEFT):
+        # Read the highlighted directory ahead, so KEY_RIGHT finds it cached
+        prefetch_near(list_directory(current_directory), current_selection)
     return current_selection, files_and_dirs, current_directory
 
 def main(stdscr):
@@ -40,7 +46,7 @@ def main(stdscr):
 
     directory_stack = []
     current_directory = os.getcwd()
-    files_and_dirs = os.listdir(current_directory)
+    files_and_dirs = list_directory(current_directory).entries
     current_selection = 0
     show_menu = False  
     display_menu(stdscr, current_selection, files_and_dirs, show_menu)
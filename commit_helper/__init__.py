@@ -0,0 +1 @@
+# Shared building blocks for git_commit_helper.py
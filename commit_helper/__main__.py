@@ -0,0 +1,5 @@
+import sys
+
+from commit_helper.cli import main
+
+sys.exit(main())
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# Benchmarks for git_commit_helper.py.
+#
+#   python -m commit_helper.bench commit [--runs N]
+#   python -m commit_helper.bench startup [--runs N] [--budget-ms MS]
+#   python -m commit_helper.bench format [--count N]
+#
+# "commit" times launch-to-exit of one commit in a scratch repository, once
+# through the headless flags and once through the curses UI driven by
+# scripted keystrokes on a pseudo terminal. Both skip the push.
+#
+# "startup" imports the entry point under python -X importtime and reports its
+# cumulative import time (best of N fresh interpreters). It exits with status 1
+# when that is over budget or when a module that must stay lazy got imported,
+# so it can gate CI; check_startup() returns the same verdict to callers.
+#
+# "format" runs N generated titles and messages through format_many() and
+# through the word-by-word process_code_string it replaced, reports the
+# throughput of both, and exits with status 1 unless every output is the same.
+
+import argparse
+import fcntl
+import os
+import pty
+import random
+import re
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "git_commit_helper.py")
+
+# Pick the default commit type, type a title and message, commit with every
+# changed file picked, do not push, leave
+INTERACTIVE_KEYS = b"\nbench title\nbench message\ny\nn\n"
+
+
+def make_repo(path):
+    for command in (
+        ["git", "init", "-q"],
+        ["git", "config", "user.name", "bench"],
+        ["git", "config", "user.email", "bench@example.com"],
+        ["git", "commit", "-q", "--allow-empty", "-m", "init"],
+    ):
+        subprocess.run(command, cwd=path, check=True)
+
+
+# Make sure there is something to commit
+def touch(repo, run):
+    with open(os.path.join(repo, "bench.txt"), "a") as f:
+        f.write("%d\n" % run)
+
+
+def time_headless(repo):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, SCRIPT, "--title", "bench title", "--message", "bench message", "--no-push"],
+        cwd=repo, stdout=subprocess.DEVNULL, check=True,
+    )
+    return time.perf_counter() - start
+
+
+def time_interactive(repo, rows=24, cols=80):
+    env = dict(os.environ, TERM="xterm-256color")
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, stdout=subprocess.PIPE, check=True).stdout
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(repo)
+        os.execve(sys.executable, [sys.executable, SCRIPT], env)
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+    os.write(fd, INTERACTIVE_KEYS)
+    output = []
+    try:
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            output.append(data)
+    except OSError:
+        pass  # EIO once the child has exited
+    os.close(fd)
+    os.waitpid(pid, 0)
+    elapsed = time.perf_counter() - start
+    if head == subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, stdout=subprocess.PIPE, check=True).stdout:
+        raise RuntimeError("interactive run did not commit:\n" + b"".join(output)[-500:].decode("utf-8", "replace"))
+    return elapsed
+
+
+def bench_commit(runs):
+    results = {}
+    with tempfile.TemporaryDirectory() as repo:
+        make_repo(repo)
+        for name, timer in (("headless", time_headless), ("interactive", time_interactive)):
+            samples = []
+            for run in range(runs):
+                touch(repo, run)
+                samples.append(timer(repo))
+            results[name] = samples
+            print("%-12s median %7.1f ms  min %7.1f ms  (%d runs)" % (
+                name, statistics.median(samples) * 1000, min(samples) * 1000, runs))
+    return results
+
+
+ENTRY_MODULE = "commit_helper.cli"
+STARTUP_BUDGET_MS = 10.0
+# Modules the entry point must not import before it knows it needs them
+LAZY_MODULES = ("curses", "_curses", "emoji", "argparse")
+
+
+# Cumulative import time of module in a fresh interpreter, and every module it loaded
+def import_time(module=ENTRY_MODULE):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    cumulative = None
+    loaded = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package", nested imports indented
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        loaded.append(name.strip())
+        if name.strip() == module:
+            cumulative = int(cumulative_us)
+    return cumulative / 1000.0, loaded
+
+
+# Returns (ok, best import time in ms, lazy modules that were imported)
+def check_startup(budget_ms=STARTUP_BUDGET_MS, runs=5, module=ENTRY_MODULE):
+    best = None
+    eager = set()
+    for _ in range(runs):
+        ms, loaded = import_time(module)
+        best = ms if best is None else min(best, ms)
+        eager.update(name for name in loaded if name in LAZY_MODULES)
+    return best <= budget_ms and not eager, best, sorted(eager)
+
+
+def bench_startup(runs, budget_ms):
+    ok, ms, eager = check_startup(budget_ms, runs)
+    print("import %s: %.1f ms (budget %.1f ms, best of %d)" % (ENTRY_MODULE, ms, budget_ms, runs))
+    for module in ("commit_helper.headless", "commit_helper.ui"):
+        print("import %s: %.1f ms" % (module, min(import_time(module)[0] for _ in range(runs))))
+    if eager:
+        print("imported eagerly: " + ", ".join(eager))
+    print("OK" if ok else "FAIL")
+    return ok
+
+
+# process_code_string as it was before the single-pass rewrite, to check the
+# new one against
+def _reference_process_code_string(title, ignored_words, capitalize_mode="first"):
+    words = title.split()
+    processed_words = []
+    processing_words = []
+    tick_open = False
+    ext_regex = re.compile(r"\.[a-zA-Z0-9]+$")
+    for idx, word in enumerate(words):
+        if word.startswith("`"):
+            if tick_open:
+                param = processing_words.pop(0)
+                processed_words.append(param + "`")
+                for pword in processing_words:
+                    processed_words.append(pword if pword.lower() in ignored_words else pword.capitalize())
+                processing_words.clear()
+                tick_open = False
+            if word.endswith("`"):
+                processed_words.append(word)
+                continue
+            elif re.search(ext_regex, word):
+                processed_words.append(word + "`")
+                continue
+            else:
+                tick_open = True
+                processing_words.append(word)
+                continue
+        elif word.endswith("`"):
+            tick_open = False
+            processing_words.append(word)
+            for pword in processing_words:
+                processed_words.append(pword)
+            processing_words.clear()
+            continue
+        if tick_open:
+            if re.search(ext_regex, word):
+                tick_open = False
+                processing_words.append(word + "`")
+            else:
+                processing_words.append(word)
+        elif capitalize_mode == "first" and idx == 0:
+            processed_words.append(word.capitalize())
+        elif capitalize_mode == "all":
+            processed_words.append(word if word.lower() in ignored_words else word.capitalize())
+        else:
+            processed_words.append(word.lower())
+    if tick_open:
+        param = processing_words.pop(0)
+        processed_words.append(param + "`")
+        for pword in processing_words:
+            processed_words.append(pword if pword.lower() in ignored_words else pword.capitalize())
+        processing_words.clear()
+    if capitalize_mode == "first" and not processed_words[-1].endswith("."):
+        processed_words[-1] += "."
+    return " ".join(processed_words)
+
+
+FORMAT_WORDS = ("fix", "the", "parser", "for", "Windows", "add", "support", "of", "cache", "in", "UI", "update")
+FORMAT_CODE = ("`main", "`get_input`", "`ui.py", "helper.py", "`show_menu", "menu`", "`.git", "stream.py`")
+
+
+# Deterministic titles like people write them, about one in four with code spans
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(count):
+        words = [rng.choice(FORMAT_WORDS)]  # Never empty after formatting
+        for _ in range(rng.randint(1, 9)):
+            words.append(rng.choice(FORMAT_CODE) if rng.random() < 0.04 else rng.choice(FORMAT_WORDS))
+        titles.append(" ".join(words))
+    return titles
+
+
+def bench_format(count):
+    from commit_helper.formatting import IGNORED_WORDS, format_many
+
+    titles = make_titles(count)
+    ok = True
+    for mode in ("all", "first"):
+        start = time.perf_counter()
+        expected = [_reference_process_code_string(title, IGNORED_WORDS, mode) for title in titles]
+        reference = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = list(format_many(titles, capitalize_mode=mode))
+        new = time.perf_counter() - start
+        same = actual == expected
+        ok = ok and same
+        print("%-5s  reference %8.0f titles/s  format_many %8.0f titles/s  (%.1fx, %d titles, %s)"
+              % (mode, count / reference, count / new, reference / new, count, "identical" if same else "DIFFERENT"))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="bench", required=True)
+    commit = sub.add_parser("commit", help="launch-to-commit latency, headless vs interactive")
+    commit.add_argument("--runs", type=int, default=10)
+    startup = sub.add_parser("startup", help="import time of the entry point, checked against a budget")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    fmt = sub.add_parser("format", help="title formatting throughput, checked against the previous implementation")
+    fmt.add_argument("--count", type=int, default=1000000)
+    args = parser.parse_args(argv)
+    if args.bench == "commit":
+        bench_commit(args.runs)
+    elif args.bench == "startup" and not bench_startup(args.runs, args.budget_ms):
+        return 1
+    elif args.bench == "format" and not bench_format(args.count):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# Guess the commit type from the change set, to preselect it in the menu.
+#
+# The guess runs on a thread. It streams `git diff --cached --name-status -z`
+# and, when nothing is staged yet (the helper stages after the prompts), falls
+# back to the prefetched status, which is what the staging picker offers by
+# default. Reading stops after MAX_CHANGES entries or MAX_SECONDS and the
+# guess is made from what was read, so a huge diff never holds anything up;
+# the menu only takes the guess if it is ready before the user moves.
+
+import os
+import subprocess
+import threading
+import time
+
+from commit_helper.formatting import EMOJIS, find_commit_type
+from commit_helper.status import UNTRACKED, peek_status, read_status
+
+MAX_CHANGES = 5000
+MAX_SECONDS = 2.0
+CHUNK = 64 * 1024
+
+# Not .txt: requirements.txt or CMakeLists.txt are no documentation; text
+# files under docs/ count anyway
+DOC_EXTENSIONS = (".md", ".rst", ".adoc")
+
+
+def _is_readme(path):
+    return os.path.basename(path).lower().startswith("readme")
+
+
+def _is_doc(path):
+    return path.lower().endswith(DOC_EXTENSIONS) or path.startswith(("docs/", "doc/")) or "/docs/" in path
+
+
+# Commit type for a list of (status letter, path), or None to keep the default
+def classify_changes(changes, initial=False):
+    if not changes:
+        return None
+    if initial:
+        return find_commit_type("Start")
+    paths = [path for _, path in changes]
+    if all(_is_readme(path) for path in paths):
+        return find_commit_type("Readme")
+    if all(_is_doc(path) for path in paths):
+        return find_commit_type("Add Documentation")
+    letters = [letter for letter, _ in changes]
+    if all(letter == "D" for letter in letters):
+        return find_commit_type("Remove")
+    if all(letter == "A" for letter in letters):
+        return find_commit_type("Add")
+    added = letters.count("A")
+    deleted = letters.count("D")
+    if deleted > len(letters) // 2:
+        return find_commit_type("Remove")
+    if added > len(letters) // 2:
+        return find_commit_type("Add")
+    return find_commit_type("Update")
+
+
+class CommitTypeGuess:
+    def __init__(self, repo, max_changes=MAX_CHANGES, max_seconds=MAX_SECONDS):
+        self.repo = repo
+        self.max_changes = max_changes
+        self.deadline = time.monotonic() + max_seconds
+        self.guess = None
+        self.done = False
+        self._thread = threading.Thread(target=self._run, name="commit-type-guess", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            initial = subprocess.run(["git", "rev-parse", "-q", "--verify", "HEAD"], cwd=self.repo.worktree,
+                                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL).returncode != 0
+            changes = self._staged_changes() or self._pending_changes()
+            self.guess = classify_changes(changes, initial)
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            pass
+        self.done = True
+
+    # (letter, path) from the index, streamed; renames and copies count as adds
+    def _staged_changes(self):
+        process = subprocess.Popen(["git", "diff", "--cached", "--name-status", "-z", "--no-ext-diff"],
+                                   cwd=self.repo.worktree, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        changes = []
+        rest = b""
+        letter = None
+        paths = 0  # Path records still to come for the current letter
+        try:
+            while len(changes) < self.max_changes and time.monotonic() < self.deadline:
+                chunk = os.read(process.stdout.fileno(), CHUNK)
+                if not chunk:
+                    break
+                records = (rest + chunk).split(b"\0")
+                rest = records.pop()
+                for record in records:
+                    if paths == 0:
+                        letter = record[:1].decode("ascii", "replace")
+                        paths = 2 if letter in ("R", "C") else 1
+                        continue
+                    paths -= 1
+                    if paths == 0:
+                        path = record.decode("utf-8", "surrogateescape")
+                        changes.append(("A" if letter in ("R", "C") else letter, path))
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+        return changes
+
+    # Everything the staging picker would commit by default
+    def _pending_changes(self):
+        entries = peek_status(self.repo)
+        if entries is None:
+            entries = read_status(self.repo.worktree)
+        changes = []
+        for entry in entries[: self.max_changes]:
+            if entry.kind == UNTRACKED:
+                changes.append(("A", entry.path))
+            elif entry.xy:
+                letter = entry.xy[0] if entry.xy[0] != "." else entry.xy[1]
+                changes.append(("A" if letter in ("R", "C") else letter, entry.path))
+        return changes
+
+    # Index into EMOJIS of the guess, or None if there is none (yet)
+    def index(self):
+        if not self.done or self.guess not in EMOJIS:
+            return None
+        return EMOJIS.index(self.guess)
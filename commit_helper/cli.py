@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Command line entry point.
+#
+# Importing this module has no side effects and loads nothing beyond os and
+# sys: argparse is only imported when there are arguments to parse, and the
+# curses front end and the headless flow only once the arguments say which one
+# runs, so a headless commit never loads curses.
+
+import os
+import sys
+
+PROMPTS = ["Enter commit title: ", "Enter commit message: "]
+CONFIRMATIONS = ["Commit title: ", "Commit message: "]
+
+
+# Idle window for deferred pushes from COMMIT_HELPER_DEFER_PUSH, or None to
+# push right away (see commit_helper/pushqueue.py)
+def defer_push_from_env():
+    value = os.environ.get("COMMIT_HELPER_DEFER_PUSH")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+# Use the helper daemon (see commit_helper/daemon.py) per COMMIT_HELPER_DAEMON
+def daemon_from_env():
+    return os.environ.get("COMMIT_HELPER_DAEMON", "").lower() in ("1", "true", "yes", "on")
+
+
+def parse_args(argv):
+    import argparse
+
+    from commit_helper.formatting import EMOJIS
+
+    parser = argparse.ArgumentParser(description="Format, commit and push the changes in the current repository.")
+    parser.add_argument("--title", help="commit title; runs without the interactive UI")
+    parser.add_argument("--message", default="", help="commit message body")
+    parser.add_argument("--type", default=EMOJIS[0], help='commit type, by emoji or name (default: "%(default)s")')
+    parser.add_argument("--no-push", action="store_true", help="commit without pushing")
+    parser.add_argument("--stdin", action="store_true", help="read the title (first line) and message (rest) from stdin")
+    parser.add_argument("--defer-push", type=float, nargs="?", const=30.0, default=defer_push_from_env(), metavar="SECONDS",
+                        help="queue the push and let a background worker push once no commit has been made for "
+                             "SECONDS (default: 30, or $COMMIT_HELPER_DEFER_PUSH)")
+    parser.add_argument("--daemon", action="store_true", default=daemon_from_env(),
+                        help="get the path list, status and title history from a background helper daemon, "
+                             "starting it if needed (default: $COMMIT_HELPER_DAEMON)")
+    args = parser.parse_args(argv)
+    if args.stdin:
+        title, _, message = sys.stdin.read().partition("\n")
+        args.title = title
+        args.message = " ".join(message.split()) or args.message
+    elif args.title is None and (args.message or args.no_push or args.type != EMOJIS[0]):
+        parser.error("--title or --stdin is required without the interactive UI")
+    return args
+
+
+def run_headless(args):
+    from commit_helper.headless import main_headless
+
+    try:
+        return main_headless(args.title, args.message, args.type, push=not args.no_push, defer_push=args.defer_push)
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+
+def run_interactive(defer_push=None, use_daemon=False):
+    import curses
+
+    from commit_helper import ui
+
+    try:
+        curses.wrapper(ui.main, PROMPTS, CONFIRMATIONS, defer_push, use_daemon)
+        print("\033[32m" + "\nSuccess." + "\033[0m")
+    except KeyboardInterrupt:
+        print("\033[31m" + "\nOperation cancelled by the user." + "\033[0m")
+    except Exception as e:
+        print("\033[31m" + "\n" + str(e) + "\033[0m")
+    if os.environ.get("COMMIT_HELPER_STATS"):
+        from commit_helper.editor import REDRAW_STATS
+        from commit_helper.render import OUTPUT_METER
+
+        print("Redraw: " + REDRAW_STATS.summary())
+        print("Output: " + OUTPUT_METER.summary())
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return run_interactive(defer_push_from_env(), daemon_from_env())
+    args = parse_args(argv)
+    if args.title is not None:
+        return run_headless(args)
+    return run_interactive(args.defer_push, args.daemon)
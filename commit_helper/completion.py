@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Prefix completion of repository paths.
+#
+# Paths are kept in one sorted list. Everything starting with a prefix is the
+# contiguous run found by bisect, and completions stop at the next "/" like a
+# shell does: after finding "src/server/" the search jumps straight past every
+# path below it with one more bisect. Completing therefore costs one bisect per
+# candidate returned, however many files sit under the prefix.
+
+import os
+from bisect import bisect_left, insort
+
+from commit_helper.pathindex import get_repo_paths
+
+# Never offer more than this many candidates for cycling
+MAX_CANDIDATES = 200
+
+
+class PathCompleter:
+    def __init__(self, paths):
+        self.paths = sorted(paths)
+        self.version = 0  # Of the RepoPaths it reflects
+
+    def update(self, added, removed):
+        if removed:
+            self.paths = [path for path in self.paths if path not in removed]
+        for path in added:
+            insort(self.paths, path)
+
+    # Next-component completions of prefix, e.g. "src/se" -> ["src/server/", "src/setup.py"]
+    def complete(self, prefix, limit=MAX_CANDIDATES):
+        paths = self.paths
+        candidates = []
+        i = bisect_left(paths, prefix)
+        while i < len(paths) and len(candidates) < limit:
+            path = paths[i]
+            if not path.startswith(prefix):
+                break
+            slash = path.find("/", len(prefix))
+            if slash < 0:
+                candidates.append(path)
+                i += 1
+            else:
+                directory = path[: slash + 1]
+                candidates.append(directory)
+                # "0" sorts right after "/", so this skips the whole subtree
+                i = bisect_left(paths, directory[:-1] + "0", i)
+        return candidates
+
+
+# Longest prefix shared by all candidates
+def common_prefix(candidates):
+    return os.path.commonprefix(candidates) if candidates else ""
+
+
+_COMPLETERS = {}
+
+
+def get_completer(cwd):
+    repo_paths = get_repo_paths(cwd)
+    completer = _COMPLETERS.get(cwd)
+    if completer is not None and completer.version != repo_paths.version:
+        changes = repo_paths.changes_since(completer.version)
+        if changes is None:
+            completer = None
+        else:
+            completer.update(*changes)
+    if completer is None:
+        completer = _COMPLETERS[cwd] = PathCompleter(repo_paths.paths)
+    completer.version = repo_paths.version
+    return completer
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+# Optional per-user helper daemon that keeps repository data warm.
+#
+#   python -m commit_helper.daemon serve [--idle SECONDS] [--warm WORKTREE]
+#   python -m commit_helper.daemon status|stop
+#
+# Enabled with --daemon or COMMIT_HELPER_DAEMON=1. The curses front end then
+# asks the daemon, over a Unix socket only the user can reach, for what it
+# would otherwise compute at every launch:
+#
+#   paths    the git ls-files list behind the fuzzy finder and completion,
+#            kept current by the directory watcher
+#   status   porcelain v2 status, reused until the index, HEAD or a watched
+#            file changes, and recomputed shortly after a change so the next
+#            launch finds it ready
+#   titles   the commit title index, brought up to date when HEAD moves
+#
+# Each request is one connection: a JSON line in, a JSON header line and
+# `size` bytes of payload out. Everything the daemon does not answer in time
+# is computed locally as before, so a missing socket, a dead daemon or an old
+# one only costs the connect attempt. When no daemon is running the client
+# starts one, warming the current repository, and carries on standalone; the
+# next launch is the fast one. The daemon exits after IDLE_SECONDS without
+# requests, and a flock next to the socket keeps it to one per user.
+#
+# The daemon runs git behind the user's back, so it never writes the index:
+# status runs with --no-optional-locks and there is no index refresh, or a
+# rebase or checkout in another terminal could find index.lock taken. The
+# directory watches are the daemon's; a client that got its path list from
+# here fetches it again rather than watching the same directories itself.
+
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SOCKET_NAME = "commit-helper.sock"
+IDLE_SECONDS = 900.0
+CONNECT_TIMEOUT = 0.2
+REQUEST_TIMEOUT = 10.0
+SETTLE_SECONDS = 1.0  # Quiet time after a change before the status is recomputed
+
+
+# Socket path in a directory only this user can use, or None
+def socket_path():
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if not base or not os.path.isdir(base):
+        base = os.path.join(tempfile.gettempdir(), "commit-helper-%d" % os.getuid())
+        try:
+            os.mkdir(base, 0o700)
+        except FileExistsError:
+            pass
+        except OSError:
+            return None
+    st = os.stat(base)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return None  # Someone else's, or readable by others: don't trust it
+    return os.path.join(base, SOCKET_NAME)
+
+
+def _repo_fields(repo):
+    return {"worktree": repo.worktree, "git_dir": repo.git_dir, "common_dir": repo.common_dir}
+
+
+def _head(repo):
+    return subprocess.run(["git", "rev-parse", "-q", "--verify", "HEAD"], cwd=repo.worktree, stdin=subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+
+
+def _encode(items):
+    return "\0".join(items).encode("utf-8", "surrogateescape")
+
+
+def _decode(payload):
+    text = payload.decode("utf-8", "surrogateescape")
+    return text.split("\0") if text else []
+
+
+class DaemonClient:
+    def __init__(self, path):
+        self.path = path
+
+    def _request(self, request, timeout=REQUEST_TIMEOUT):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(self.path)
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            stream = sock.makefile("rb")
+            header = json.loads(stream.readline() or b"null")
+            if not isinstance(header, dict) or not header.get("ok"):
+                raise ValueError("helper daemon: %s" % (header or {}).get("error", "no answer"))
+            payload = stream.read(header.get("size", 0))
+            if len(payload) != header.get("size", 0):
+                raise ValueError("helper daemon: short answer")
+            return header, payload
+
+    def ping(self):
+        try:
+            self._request({"op": "ping"}, CONNECT_TIMEOUT)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def paths(self, repo):
+        return _decode(self._request(dict(_repo_fields(repo), op="paths"))[1])
+
+    # (status entries, index key) as StatusPrefetch expects them
+    def status(self, repo):
+        from commit_helper.status import parse_status
+
+        header, payload = self._request(dict(_repo_fields(repo), op="status"))
+        key = header.get("index_key")
+        return parse_status(payload), tuple(key) if key else None
+
+    # The title index, or None if the daemon could not build one
+    def titles(self, repo):
+        from commit_helper.history import parse_entries
+
+        header, payload = self._request(dict(_repo_fields(repo), op="titles"))
+        if header.get("missing"):
+            return None
+        return parse_entries(payload.decode("utf-8", "surrogateescape"))
+
+    # Fill the path list of the fuzzy finder and completion, to be kept
+    # current from here too; blocks, so run it on a thread
+    def prefill_paths(self, repo):
+        from commit_helper.pathindex import seed_repo_paths
+
+        try:
+            seed_repo_paths(repo.worktree, self.paths(repo), lambda: self.paths(repo))
+        except (OSError, ValueError):
+            pass  # git ls-files runs when the paths are first needed
+
+    def stop(self):
+        self._request({"op": "stop"}, CONNECT_TIMEOUT)
+
+
+def start_daemon(warm=None):
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (package_root, env.get("PYTHONPATH")) if p)
+    subprocess.Popen([sys.executable, "-m", "commit_helper.daemon", "serve"] + (["--warm", warm] if warm else []),
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     cwd="/", env=env, start_new_session=True)
+
+
+# A client for the running daemon, or None to work standalone (starting a
+# daemon for next time if there is none)
+def connect(repo=None, start=True):
+    path = socket_path()
+    if path is None:
+        return None
+    client = DaemonClient(path)
+    if client.ping():
+        return client
+    if start:
+        try:
+            start_daemon(repo.worktree if repo is not None else None)
+        except OSError:
+            pass
+    return None
+
+
+class RepoState:
+    def __init__(self, repo):
+        from commit_helper.watch import get_watcher
+
+        self.repo = repo
+        self.lock = threading.Lock()
+        self.status = None  # (porcelain bytes, index key) for status_key
+        self.status_key = None
+        self.dirty = True
+        self.history = None
+        self.history_head = None
+        self._timer = None
+        self.watcher = get_watcher()
+        if self.watcher is not None:
+            self.watcher.subscribe(self._changed)
+
+    # Watcher thread: a change in the working tree outside .git
+    def _changed(self, kind, directory, name, is_dir):
+        from commit_helper.watch import in_worktree
+
+        if not in_worktree(self.repo.worktree, directory, name):
+            return
+        self.dirty = True
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(SETTLE_SECONDS, self._settled)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _settled(self):
+        try:
+            self.read_status()
+        except (OSError, subprocess.CalledProcessError):
+            pass
+
+    def paths(self):
+        from commit_helper.pathindex import get_repo_paths
+
+        with self.lock:
+            return list(get_repo_paths(self.repo.worktree).paths)
+
+    # Trusting the cached status needs every directory watched
+    def _watched(self):
+        from commit_helper.pathindex import get_repo_paths
+
+        return get_repo_paths(self.repo.worktree).fully_watched()
+
+    def read_status(self):
+        from commit_helper.status import index_key, status_bytes
+
+        with self.lock:
+            key = (index_key(self.repo.git_dir), _head(self.repo))
+            if self.status is None or self.dirty or key != self.status_key or not self._watched():
+                self.dirty = False
+                data = status_bytes(self.repo.worktree, optional_locks=False)
+                self.status_key = (index_key(self.repo.git_dir), key[1])
+                self.status = (data, self.status_key[0])
+            return self.status
+
+    def titles(self):
+        from commit_helper.history import TitleHistory
+
+        head = _head(self.repo)
+        with self.lock:
+            if self.history is None or head != self.history_head:
+                history = TitleHistory(self.repo)
+                history.wait()
+                self.history = history.index
+                self.history_head = head
+            return self.history
+
+
+class Daemon:
+    def __init__(self, path, idle=IDLE_SECONDS):
+        self.path = path
+        self.idle = idle
+        self.repos = {}
+        self.last_request = time.monotonic()
+        self.busy = 0
+        self.stopping = False
+        self._lock = threading.Lock()
+
+    def state(self, request):
+        from commit_helper.repo import Repository
+
+        worktree = request["worktree"]
+        with self._lock:
+            state = self.repos.get(worktree)
+            if state is None:
+                repo = Repository(worktree, request["git_dir"], request["common_dir"])
+                state = self.repos[worktree] = RepoState(repo)
+        return state
+
+    def answer(self, request):
+        from commit_helper.history import format_entries
+
+        op = request.get("op")
+        if op == "ping":
+            return {}, b""
+        if op == "stop":
+            self.stopping = True
+            return {}, b""
+        if op == "paths":
+            return {}, _encode(self.state(request).paths())
+        if op == "status":
+            data, key = self.state(request).read_status()
+            return {"index_key": key}, data
+        if op == "titles":
+            index = self.state(request).titles()
+            if index is None:
+                return {"missing": True}, b""
+            return {}, format_entries(index).encode("utf-8", "surrogateescape")
+        raise ValueError("unknown request: %r" % op)
+
+    def handle(self, conn):
+        with conn:
+            try:
+                conn.settimeout(REQUEST_TIMEOUT)
+                request = json.loads(conn.makefile("rb").readline() or b"null")
+                if not isinstance(request, dict):
+                    raise ValueError("bad request")
+                header, payload = self.answer(request)
+                header.update(ok=True, size=len(payload))
+            except Exception as e:
+                header, payload = {"ok": False, "error": str(e)}, b""
+            try:
+                conn.sendall(json.dumps(header).encode() + b"\n" + payload)
+            except OSError:
+                pass
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.last_request = time.monotonic()
+
+    # Warm a repository before anyone asks, e.g. the one that started us
+    def warm(self, worktree):
+        from commit_helper.repo import discover_repository
+
+        repo = discover_repository(worktree)
+        if repo is None:
+            return
+        state = self.state(_repo_fields(repo))
+        try:
+            state.paths()
+            state.read_status()
+            state.titles()
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            pass
+
+    def serve(self, warm=()):
+        lock = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock)
+            return 0  # Another daemon is running
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                os.unlink(self.path)  # Left by a daemon that died
+            except FileNotFoundError:
+                pass
+            server.bind(self.path)
+            os.chmod(self.path, 0o600)
+            server.listen(16)
+            server.settimeout(1.0)
+            for worktree in warm:
+                threading.Thread(target=self.warm, args=(worktree,), name="warm", daemon=True).start()
+            while not self.stopping:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    with self._lock:
+                        if self.busy == 0 and time.monotonic() - self.last_request > self.idle:
+                            break
+                    continue
+                with self._lock:
+                    self.busy += 1
+                    self.last_request = time.monotonic()
+                threading.Thread(target=self.handle, args=(conn,), name="request", daemon=True).start()
+        finally:
+            server.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            os.close(lock)  # Drops the flock
+        return 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m commit_helper.daemon",
+                                     description="Keep repository data warm for the commit helper.")
+    parser.add_argument("command", choices=["serve", "status", "stop"])
+    parser.add_argument("--idle", type=float, default=IDLE_SECONDS, help="exit after this many idle seconds")
+    parser.add_argument("--warm", action="append", default=[], metavar="WORKTREE", help="repository to load at start")
+    args = parser.parse_args(argv)
+    path = socket_path()
+    if path is None:
+        print("No private directory for the socket", file=sys.stderr)
+        return 1
+    if args.command == "serve":
+        return Daemon(path, args.idle).serve(args.warm)
+    client = DaemonClient(path)
+    running = client.ping()
+    if args.command == "stop" and running:
+        client.stop()
+    print(("Running on " if running else "Not running; socket would be ") + path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# Line editor for get_input: a gap buffer plus a damage-tracked view.
+#
+# The gap buffer keeps the free space at the cursor, so typing or deleting
+# there is O(1) amortized and only moving the cursor shifts characters.
+# LineView remembers what is on screen and, after an edit at index i, rewrites
+# only the characters from i to the end of the text (plus blanks over any
+# leftover cells when the text got shorter). The prompt is drawn once. An
+# optional ghost (a suggested continuation) is drawn after the text.
+#
+# KeyReader drains every key already queued before the caller repaints, so a
+# paste (bracketed or not) becomes one insert and one screen update.
+
+import sys
+
+
+class GapBuffer:
+    def __init__(self, text="", capacity=64):
+        size = max(capacity, 2 * len(text))
+        self._buf = list(text) + [""] * (size - len(text))
+        self._gap_start = len(text)
+        self._gap_end = size
+
+    def __len__(self):
+        return len(self._buf) - (self._gap_end - self._gap_start)
+
+    @property
+    def cursor(self):
+        return self._gap_start
+
+    # Move the gap to pos, shifting only the characters in between
+    def move_to(self, pos):
+        buf = self._buf
+        pos = max(0, min(pos, len(self)))
+        if pos < self._gap_start:
+            count = self._gap_start - pos
+            buf[self._gap_end - count : self._gap_end] = buf[pos : self._gap_start]
+            self._gap_start -= count
+            self._gap_end -= count
+        elif pos > self._gap_start:
+            count = pos - self._gap_start
+            buf[self._gap_start : self._gap_start + count] = buf[self._gap_end : self._gap_end + count]
+            self._gap_start += count
+            self._gap_end += count
+
+    def _grow(self, needed):
+        size = len(self._buf)
+        extra = max(size, needed)
+        self._buf[self._gap_end : self._gap_end] = [""] * extra
+        self._gap_end += extra
+
+    def insert(self, text):
+        if len(text) > self._gap_end - self._gap_start:
+            self._grow(len(text))
+        self._buf[self._gap_start : self._gap_start + len(text)] = text
+        self._gap_start += len(text)
+
+    # Backspace: remove up to count characters left of the cursor
+    def delete_before(self, count=1):
+        count = min(count, self._gap_start)
+        self._gap_start -= count
+        return count
+
+    # Delete: remove up to count characters right of the cursor
+    def delete_after(self, count=1):
+        count = min(count, len(self._buf) - self._gap_end)
+        self._gap_end += count
+        return count
+
+    # Text from index start to the end
+    def tail(self, start=0):
+        if start < self._gap_start:
+            return "".join(self._buf[start : self._gap_start]) + "".join(self._buf[self._gap_end :])
+        return "".join(self._buf[self._gap_end + start - self._gap_start :])
+
+    def text(self):
+        return self.tail(0)
+
+
+class RedrawStats:
+    def __init__(self):
+        self.redraws = 0
+        self.cells = 0
+        self.max_cells = 0
+        self.last_cells = 0
+
+    def record(self, cells):
+        self.redraws += 1
+        self.cells += cells
+        self.last_cells = cells
+        self.max_cells = max(self.max_cells, cells)
+
+    def summary(self):
+        average = self.cells / self.redraws if self.redraws else 0
+        return "redraws: %d, cells written: %d (avg %.1f, max %d per redraw)" % (
+            self.redraws, self.cells, average, self.max_cells)
+
+
+# Cells written by every LineView in the process
+REDRAW_STATS = RedrawStats()
+
+
+class LineView:
+    # wide_extra: extra cells taken by the first character (the commit type emoji)
+    def __init__(self, window, y, prompt, prompt_attr, wide_extra=0):
+        self.window = window
+        self.y = y
+        self.prompt = prompt
+        self.prompt_attr = prompt_attr
+        self.wide_extra = wide_extra
+        self.drawn_len = 0  # Characters of text currently on screen
+        self.damage = None  # Lowest text index whose cells are stale
+        self.full = True  # Prompt and all lines have to be redrawn
+        self.ghost = ""  # Suggested continuation, shown dimmed after the text
+        self.ghost_attr = 0
+        self.drawn_ghost = ""
+
+    # Screen row and column of text index
+    def cell(self, index):
+        _, max_x = self.window.getmaxyx()
+        pos = len(self.prompt) + index + (self.wide_extra if index > 0 else 0)
+        return self.y + pos // max_x, pos % max_x
+
+    def mark(self, index):
+        self.damage = index if self.damage is None else min(self.damage, index)
+
+    def invalidate(self):
+        self.full = True
+
+    # Write text at (row, col) without running off the bottom-right corner
+    def _put(self, row, col, text, attr=0):
+        max_y, max_x = self.window.getmaxyx()
+        room = (max_y - row) * max_x - col - 1
+        if row >= max_y or room <= 0 or not text:
+            return 0
+        if attr:
+            self.window.attron(attr)
+        self.window.addnstr(row, col, text, room)
+        if attr:
+            self.window.attroff(attr)
+        return min(len(text), room)
+
+    # Bring the screen up to date with buffer and place the cursor
+    def draw(self, buffer):
+        max_y, max_x = self.window.getmaxyx()
+        new_len = len(buffer)
+        cells = 0
+        if self.full:
+            last_row = self.cell(max(self.drawn_len + len(self.drawn_ghost), new_len))[0]
+            for row in range(self.y, min(last_row, max_y - 1) + 1):
+                self.window.move(row, 0)
+                self.window.clrtoeol()
+                cells += max_x
+            cells += self._put(self.y, 0, self.prompt, self.prompt_attr)
+            self.damage = 0
+        if self.damage is not None and self.damage < new_len:
+            cells += self._put(*self.cell(self.damage), buffer.tail(self.damage))
+        if not self.full and self.drawn_len > new_len:
+            cells += self._put(*self.cell(new_len), " " * (self.drawn_len - new_len))
+        # The ghost follows the text, so it moves whenever the text changed
+        if self.ghost or self.drawn_ghost:
+            if self.ghost != self.drawn_ghost or new_len != self.drawn_len or self.full:
+                cells += self._put(*self.cell(new_len), self.ghost, self.ghost_attr)
+                stale = self.drawn_len + len(self.drawn_ghost) - new_len - len(self.ghost)
+                if stale > 0:
+                    cells += self._put(*self.cell(new_len + len(self.ghost)), " " * stale)
+            self.drawn_ghost = self.ghost
+        self.full = False
+        self.damage = None
+        self.drawn_len = new_len
+
+        row, col = self.cell(buffer.cursor)
+        self.window.move(min(row, max_y - 1), min(col, max_x - 1))
+        REDRAW_STATS.record(cells)
+        return row
+
+
+# Key events are ("text", str) for runs of typed or pasted characters and
+# ("key", int) for everything else, e.g. arrows, Enter and Backspace.
+TEXT = "text"
+KEY = "key"
+
+PASTE_START = [27, 91, 50, 48, 48, 126]  # ESC [ 2 0 0 ~
+PASTE_END = [27, 91, 50, 48, 49, 126]  # ESC [ 2 0 1 ~
+
+
+def _find(keys, marker, start):
+    for i in range(start, len(keys) - len(marker) + 1):
+        if keys[i] == marker[0] and keys[i : i + len(marker)] == marker:
+            return i
+    return -1
+
+
+# Pasted bytes as one line of text: line breaks and tabs become spaces
+def _decode_paste(keys):
+    data = bytes(k for k in keys if 0 <= k <= 255).decode("utf-8", "replace")
+    data = data.replace("\r\n", " ").replace("\r", " ").replace("\n", " ").replace("\t", " ")
+    return "".join(ch for ch in data if ch.isprintable())
+
+
+# Turn a batch of getch() codes into events, merging printable runs into one
+def parse_keys(keys):
+    events = []
+    text = []
+    i = 0
+    while i < len(keys):
+        if keys[i] == 27 and keys[i : i + len(PASTE_START)] == PASTE_START:
+            end = _find(keys, PASTE_END, i + len(PASTE_START))
+            if end < 0:
+                end = len(keys)
+            text.append(_decode_paste(keys[i + len(PASTE_START) : end]))
+            i = end + len(PASTE_END)
+            continue
+        key = keys[i]
+        if 32 <= key <= 126:
+            text.append(chr(key))
+        else:
+            if text:
+                events.append((TEXT, "".join(text)))
+                text = []
+            events.append((KEY, key))
+        i += 1
+    if text:
+        events.append((TEXT, "".join(text)))
+    return [event for event in events if event != (TEXT, "")]
+
+
+class KeyReader:
+    # present(window) is called before blocking, to put pending output on screen.
+    # idle(), if given, is called every idle_ms while no key comes, e.g. to
+    # show results computed in the background; present runs again after it.
+    def __init__(self, window, present=None, idle=None, idle_ms=100):
+        self.window = window
+        self.present = present
+        self.idle = idle
+        self.idle_ms = idle_ms
+        self.pending = []  # Events read ahead of the caller, oldest first
+
+    def _wait_key(self):
+        while True:
+            if self.present is not None:
+                self.present(self.window)
+            if self.idle is None:
+                return self.window.getch()
+            self.window.timeout(self.idle_ms)
+            try:
+                key = self.window.getch()
+            finally:
+                self.window.timeout(-1)
+            if key != -1:
+                return key
+            self.idle()
+
+    # Block for one key, then take everything already queued without blocking
+    def _read_batch(self):
+        keys = [self._wait_key()]
+        self.window.nodelay(True)
+        try:
+            while True:
+                key = self.window.getch()
+                if key == -1:
+                    # A long paste can arrive in chunks, so wait for its end marker
+                    start = _find(keys, PASTE_START, 0)
+                    if start < 0 or _find(keys, PASTE_END, start) >= 0:
+                        break
+                    self.window.nodelay(False)
+                    key = self.window.getch()
+                    self.window.nodelay(True)
+                keys.append(key)
+        finally:
+            self.window.nodelay(False)
+        return keys
+
+    # All events available now, at least one
+    def read_events(self):
+        if self.pending:
+            events, self.pending = self.pending, []
+            return events
+        return parse_keys(self._read_batch())
+
+    # Give back events the caller did not consume
+    def push_back(self, events):
+        self.pending = list(events) + self.pending
+
+
+# Ask the terminal to wrap pastes in ESC [ 200 ~ ... ESC [ 201 ~
+def set_bracketed_paste(enabled, stream=None):
+    stream = stream or sys.__stdout__
+    stream.write("\033[?2004h" if enabled else "\033[?2004l")
+    stream.flush()
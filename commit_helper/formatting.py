@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Commit types and the title/message normalization shared by every front end.
+
+import re
+
+IGNORED_WORDS = {
+    "and",
+    "or",
+    "but",
+    "the",
+    "a",
+    "in",
+    "with",
+    "to",
+    "of",
+    "on",
+    "at",
+    "from",
+    "by",
+    "as",
+    "for",
+    "into",
+    "through",
+    "during",
+    "including",
+    "until",
+    "against",
+    "among",
+    "throughout",
+    "despite",
+    "towards",
+    "upon",
+    "concerning",
+    "about",
+    "like",
+    "over",
+    "before",
+    "between",
+    "after",
+    "since",
+    "without",
+    "under",
+    "within",
+    "along",
+    "following",
+    "across",
+    "behind",
+    "beyond",
+    "plus",
+    "except",
+}
+
+EMOJIS = [
+    "📝 Add Documentation",
+    "📥 Add",
+    "🔨 Fix",
+    "💨 Hotfix",
+    "🔎 Need Testing",
+    "🍻 Pass Test",
+    "📖 Readme",
+    "🔥 Remove",
+    "🎉 Start",
+    "💾 Save",
+    "🔧 Update",
+    "🎲 Pass Unit Test",
+    "🚧 Work in Progress",
+    "🏗️",
+]
+
+
+# A file extension at the end of a word closes an open backtick span
+_EXT_SEARCH = re.compile(r"\.[a-zA-Z0-9]+$").search
+
+
+# Title case of single words, remembered: titles reuse a small vocabulary, and
+# map() over a dict lookup keeps the per-word work in C. Bounded, since a long
+# history also has plenty of one-off words.
+class _TitleCase(dict):
+    LIMIT = 100000
+
+    def __init__(self, ignored_words):
+        super().__init__()
+        self.ignored_words = ignored_words
+
+    def __missing__(self, word):
+        if len(self) >= self.LIMIT:
+            self.clear()
+        value = self[word] = word if word.lower() in self.ignored_words else word.capitalize()
+        return value
+
+
+_DEFAULT_CASE = _TitleCase(IGNORED_WORDS)
+
+
+# Close an open backtick span after its first word; the words after it are
+# title-cased as if outside, whatever the capitalization mode
+def _close_span(pending, out, title_case):
+    out.append(pending[0] + "`")
+    out.extend(map(title_case.__getitem__, pending[1:]))
+
+
+def _format(title, title_case, capitalize_mode):
+    first = capitalize_mode == "first"
+    every = capitalize_mode == "all"
+
+    if "`" not in title:
+        # No code spans: every word is plain text
+        if every:
+            out = list(map(title_case.__getitem__, title.split()))
+        else:
+            # Lowercasing never makes or removes whitespace, so split once after it
+            out = title.lower().split()
+            if first and out:
+                out[0] = title.split(None, 1)[0].capitalize()
+    else:
+        words = title.split()
+        # One pass over the words. A span opens at a word starting with "`"
+        # and closes at a word ending with "`" or with a file extension; the
+        # words in an open span wait in pending until it is known how it ends.
+        out = []
+        pending = []
+        tick_open = False
+        for idx, word in enumerate(words):
+            if word[0] == "`":
+                if tick_open:
+                    _close_span(pending, out, title_case)
+                    pending = []
+                    tick_open = False
+                if word[-1] == "`":
+                    out.append(word)
+                elif _EXT_SEARCH(word):
+                    out.append(word + "`")
+                else:
+                    tick_open = True
+                    pending.append(word)
+            elif word[-1] == "`":
+                tick_open = False
+                pending.append(word)
+                out.extend(pending)
+                pending = []
+            elif tick_open:
+                if _EXT_SEARCH(word):
+                    # Closed, but the span is only written out by the next
+                    # closing backtick (and dropped if none comes)
+                    tick_open = False
+                    pending.append(word + "`")
+                else:
+                    pending.append(word)
+            elif first and idx == 0:
+                out.append(word.capitalize())
+            elif every:
+                out.append(title_case[word])
+            else:
+                out.append(word.lower())
+        # If at the end of the title but tick is still open
+        if tick_open:
+            _close_span(pending, out, title_case)
+
+    # If the capitalization mode is 'first', then add a period at the end if needed
+    if first and not out[-1].endswith("."):
+        out[-1] += "."
+    return " ".join(out)
+
+
+def _title_case(ignored_words):
+    return _DEFAULT_CASE if ignored_words is None or ignored_words is IGNORED_WORDS else _TitleCase(ignored_words)
+
+
+# Process the code string to match "`" pairs and apply capitalization
+def process_code_string(title: str, ignored_words: set = None, capitalize_mode: str = "first") -> str:
+    return _format(title, _title_case(ignored_words), capitalize_mode)
+
+
+# process_code_string over many strings, e.g. a whole history, lazily
+def format_many(titles, ignored_words: set = None, capitalize_mode: str = "first"):
+    title_case = _title_case(ignored_words)
+    for title in titles:
+        yield _format(title, title_case, capitalize_mode)
+
+
+# Find the EMOJIS entry for a commit type given by emoji or by name, e.g. "fix"
+def find_commit_type(name):
+    wanted = name.strip().lower()
+    for entry in EMOJIS:
+        icon, _, label = entry.partition(" ")
+        if wanted in (entry.lower(), icon, label.lower()):
+            return entry
+    raise ValueError("Unknown commit type: " + name + " (choose from: " + ", ".join(EMOJIS) + ")")
+
+
+# The commit type at the start of a title, longest first so "📝 Add Documentation" beats "📥 Add"
+_TYPE_PREFIX = re.compile("(%s) " % "|".join(re.escape(e) for e in sorted(EMOJIS, key=len, reverse=True)))
+
+
+# Split a title into its EMOJIS entry (None if it has none) and the rest
+def split_commit_type(title):
+    match = _TYPE_PREFIX.match(title)
+    return (match.group(1), title[match.end():]) if match else (None, title)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Commit without a terminal: no curses, only the git processes.
+
+import subprocess
+import sys
+
+from commit_helper.formatting import find_commit_type, process_code_string
+from commit_helper.repo import get_repository, is_git_repository
+
+
+# Run a git command without a terminal, passing its output through
+def run_git_command_headless(command):
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.stdout:
+        print(result.stdout, end="")
+    if result.stderr:
+        print(result.stderr, end="", file=sys.stderr)
+    if result.returncode != 0:
+        print("Git command failed: " + " ".join(command), file=sys.stderr)
+    return result.returncode == 0
+
+
+# Same normalization and add/commit/push flow as main, for scripts and CI
+def main_headless(title, message, commit_type, push=True, defer_push=None):
+    if not is_git_repository():
+        raise Exception("Not a git repository")
+    title = process_code_string(find_commit_type(commit_type) + " " + (title.strip() or "-"), capitalize_mode="all")
+    message = process_code_string(message.strip() or "-")
+    print("Commit title: " + title)
+    print("Commit message: " + message)
+    for command in (["git", "add", "."], ["git", "commit", "-m", title, "-m", message]):
+        if not run_git_command_headless(command):
+            return 1
+    if push and defer_push is not None:
+        from commit_helper.pushqueue import enqueue
+
+        entry = enqueue(get_repository(), defer_push)
+        print("Push of %s to %s queued; it runs once no commit has been made for %gs."
+              % (entry["commit"][:7], entry["ref"][len("refs/heads/"):], defer_push))
+    elif push and not run_git_command_headless(["git", "push"]):
+        return 1
+    return 0
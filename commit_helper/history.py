@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# Previous commit titles, for ghost-text suggestions while typing a title.
+#
+# Titles are indexed by their text after the commit type prefix, lowercased,
+# in one sorted list like PathCompleter: every title starting with what has
+# been typed is the contiguous run found by bisect, and the best of them is
+# the one with the highest weight (how often it was used, then how recently).
+# A sorted array is the flattened form of a prefix trie and, unlike a dict of
+# dicts, is written and read back in one linear pass.
+#
+# The index is saved under .git/ together with the commit it was built at.
+# Next time only `git log <that commit>..HEAD` is read, so a large history is
+# scanned once; when the saved commit is gone (gc after a rebase) it is
+# rebuilt from scratch. Loading and updating happen on a thread, and the
+# suggestions simply start appearing once it is done.
+
+import os
+import subprocess
+import threading
+from bisect import bisect_left
+
+from commit_helper.formatting import split_commit_type
+
+INDEX_FILE = "commit-helper-titles"
+FORMAT = "commit-helper-titles 1"
+MIN_QUERY = 2  # Characters typed after the commit type before suggesting
+CHUNK = 64 * 1024
+
+# Title text without the commit type, as it is typed into the prompt
+def strip_type(title):
+    return split_commit_type(title)[1]
+
+
+class TitleIndex:
+    def __init__(self, keys=(), titles=(), weights=()):
+        self.keys = list(keys)  # Sorted, lowercased
+        self.titles = list(titles)  # As last written, same order
+        self.weights = list(weights)  # count << 32 | newest commit ordinal
+
+    def __len__(self):
+        return len(self.keys)
+
+    # Best previous title starting with text (case-insensitively), or None
+    def suggest(self, text):
+        query = text.lower()
+        if len(query) < MIN_QUERY:
+            return None
+        lo = bisect_left(self.keys, query)
+        hi = bisect_left(self.keys, query + "\U0010ffff", lo)
+        if lo == hi:
+            return None
+        weights = self.weights[lo:hi]
+        title = self.titles[lo + weights.index(max(weights))]
+        return title if len(title) > len(text) else None
+
+    # Merge titles (newest first) whose commits got ordinals up to newest
+    def add(self, titles, newest):
+        entries = []
+        for i, title in enumerate(titles):
+            title = strip_type(title).strip()
+            key = title.lower()
+            if title and len(key) == len(title):  # Else suffixes would not line up
+                entries.append((key, title, newest - i))
+        if len(entries) * 16 < len(self.keys):
+            # A few new commits: insert them in place
+            for key, title, ordinal in reversed(entries):
+                i = bisect_left(self.keys, key)
+                if i < len(self.keys) and self.keys[i] == key:
+                    self.weights[i] = ((self.weights[i] >> 32) + 1) << 32 | ordinal
+                    self.titles[i] = title
+                else:
+                    self.keys.insert(i, key)
+                    self.titles.insert(i, title)
+                    self.weights.insert(i, 1 << 32 | ordinal)
+            return
+        merged = dict(zip(self.keys, zip(self.weights, self.titles)))
+        for key, title, ordinal in entries:
+            weight, last = merged.get(key, (0, title))
+            latest = weight & 0xFFFFFFFF
+            merged[key] = (((weight >> 32) + 1) << 32 | max(latest, ordinal), last if latest > ordinal else title)
+        self.keys = sorted(merged)
+        self.weights = [merged[key][0] for key in self.keys]
+        self.titles = [merged[key][1] for key in self.keys]
+
+
+def _index_path(repo):
+    return os.path.join(repo.common_dir, INDEX_FILE)
+
+
+# (index, commit it was built at, ordinal of that commit) from disk
+def load_index(repo):
+    try:
+        with open(_index_path(repo), encoding="utf-8", errors="surrogateescape") as f:
+            data = f.read()
+    except OSError:
+        return TitleIndex(), None, 0
+    header, _, body = data.partition("\n")
+    fields = header.rsplit(" ", 2)
+    if len(fields) != 3 or fields[0] != FORMAT:
+        return TitleIndex(), None, 0
+    return parse_entries(body), fields[1], int(fields[2])
+
+
+# The index from "weight<TAB>title" lines, as saved
+def parse_entries(body):
+    keys, titles, weights = [], [], []
+    for line in body.splitlines():
+        weight, _, title = line.partition("\t")
+        keys.append(title.lower())
+        titles.append(title)
+        weights.append(int(weight))
+    return TitleIndex(keys, titles, weights)
+
+
+def format_entries(index):
+    return "".join("%d\t%s\n" % (weight, title) for weight, title in zip(index.weights, index.titles))
+
+
+def save_index(repo, index, tip, ordinal):
+    path = _index_path(repo)
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w", encoding="utf-8", errors="surrogateescape") as f:
+        f.write("%s %s %d\n" % (FORMAT, tip, ordinal))
+        f.write(format_entries(index))
+    os.replace(tmp, path)
+
+
+# Titles of the commits in revisions, newest first, parsed as git streams them
+def read_titles(repo, revisions):
+    process = subprocess.Popen(["git", "log", "--format=%s", "-z"] + revisions + ["--"], cwd=repo.worktree,
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    titles = []
+    rest = b""
+    try:
+        while True:
+            chunk = os.read(process.stdout.fileno(), CHUNK)
+            if not chunk:
+                break
+            records = (rest + chunk).split(b"\0")
+            rest = records.pop()
+            titles.extend(record.decode("utf-8", "surrogateescape").replace("\t", " ") for record in records)
+    finally:
+        process.stdout.close()
+    if process.wait() != 0:
+        return None
+    return titles
+
+
+class TitleHistory:
+    def __init__(self, repo, fetch=None):
+        self.repo = repo
+        self.fetch = fetch  # Returns an up to date TitleIndex from elsewhere, or None
+        self.index = None  # Set once loaded and brought up to date
+        self._thread = threading.Thread(target=self._run, name="title-history", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        if self.fetch is not None:
+            try:
+                self.index = self.fetch()
+            except (OSError, ValueError):
+                pass  # Load it here instead
+        try:
+            if self.index is None:
+                self.index = self._update()
+        except (OSError, ValueError):
+            pass
+
+    def wait(self):
+        self._thread.join()
+
+    def _update(self):
+        index, tip, ordinal = load_index(self.repo)
+        head = subprocess.run(["git", "rev-parse", "-q", "--verify", "HEAD"], cwd=self.repo.worktree,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True).stdout.strip()
+        if not head or head == tip:
+            return index
+        titles = read_titles(self.repo, [tip + ".." + head]) if tip else None
+        if titles is None:
+            index, ordinal = TitleIndex(), 0  # No usable saved index: read everything
+            titles = read_titles(self.repo, [head])
+            if titles is None:
+                return index
+        ordinal += len(titles)
+        index.add(titles, ordinal)
+        save_index(self.repo, index, head, ordinal)
+        return index
+
+    # Rest of the best matching previous title for the typed text, or ""
+    def ghost(self, typed):
+        if self.index is None:
+            return ""
+        title = self.index.suggest(typed)
+        return title[len(typed):] if title is not None else ""
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Hide ignored files from the path pickers.
+#
+# Ignore rules are git's own: one `git check-ignore --stdin -z --non-matching
+# --verbose` process is started per working tree and kept for the session.
+# The names of a directory are written to it in one batch and the answers
+# read back, so opening a directory costs a round trip to an already running
+# process rather than a new process, and gitignore semantics (negation,
+# directory-only patterns, nested and global excludes) stay git's business.
+# Every answer is memoized per path. Tracked files are never reported as
+# ignored, as in git status.
+#
+# --non-matching prints four records for every path: source, line number and
+# pattern of the deciding rule (empty when none applies), then the path. A
+# rule starting with "!" re-includes the path. Batches are kept small enough
+# that git's answers fit in the pipe while we are still writing, so the two
+# sides never wait on each other.
+#
+# If the process fails (an old git, a path it refuses) filtering is switched
+# off for the working tree and the pickers simply show everything.
+
+import atexit
+import os
+import subprocess
+import threading
+
+from commit_helper.listing import DirectoryListing
+
+BATCH_BYTES = 8 * 1024
+CHUNK = 64 * 1024
+
+
+class IgnoreChecker:
+    def __init__(self, worktree):
+        self.worktree = worktree
+        self.ignored = {}  # Path relative to worktree -> bool
+        self._process = None
+        self._rest = b""
+        self._broken = False
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # GIT_FLUSH: answer each path as it comes, not when stdout fills up
+        env = dict(os.environ, GIT_FLUSH="1")
+        self._process = subprocess.Popen(["git", "check-ignore", "--stdin", "-z", "--non-matching", "--verbose"],
+                                         cwd=self.worktree, env=env, stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def _records(self, count):
+        records = []
+        while len(records) < count:
+            chunk = os.read(self._process.stdout.fileno(), CHUNK)
+            if not chunk:
+                raise OSError("git check-ignore exited")
+            records.extend((self._rest + chunk).split(b"\0"))
+            self._rest = records.pop()
+        if len(records) > count:
+            raise OSError("git check-ignore answered more than asked")
+        return records
+
+    def _ask(self, paths):
+        # The paths are pathspecs; ":(top)" keeps a name like ":x" from reading as magic
+        data = b"".join(b":(top)" + os.fsencode(path) + b"\0" for path in paths)
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+        records = self._records(4 * len(paths))
+        for i, path in enumerate(paths):
+            pattern = records[4 * i + 2]
+            self.ignored[path] = bool(pattern) and not pattern.startswith(b"!")
+
+    # Look up every path not answered yet, in batches
+    def check(self, paths):
+        with self._lock:
+            if self._broken:
+                return
+            todo = [path for path in paths if path not in self.ignored]
+            try:
+                if todo and self._process is None:
+                    self._start()
+                batch, size = [], 0
+                for path in todo:
+                    batch.append(path)
+                    size += len(path) + 1
+                    if size >= BATCH_BYTES:
+                        self._ask(batch)
+                        batch, size = [], 0
+                if batch:
+                    self._ask(batch)
+            except (OSError, ValueError):
+                self._broken = True
+                self.close()
+
+    def is_ignored(self, path):
+        return self.ignored.get(path, False)
+
+    def close(self):
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+
+_CHECKERS = {}
+
+
+def get_ignore_checker(worktree):
+    checker = _CHECKERS.get(worktree)
+    if checker is None:
+        checker = _CHECKERS[worktree] = IgnoreChecker(worktree)
+    return checker
+
+
+@atexit.register
+def _close_checkers():
+    for checker in _CHECKERS.values():
+        checker.close()
+
+
+# listing without the entries git ignores; listing itself outside a work tree
+def visible_listing(listing, worktree):
+    if worktree is None:
+        return listing
+    # Through symlinks git would refuse the path: ask about where it leads
+    relative = os.path.relpath(os.path.realpath(listing.path), worktree)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return listing
+    prefix = "" if relative == os.curdir else relative.replace(os.sep, "/") + "/"
+    paths = [prefix + name for name in listing.entries]
+    checker = get_ignore_checker(worktree)
+    checker.check(paths)
+    dirs = []
+    files = []
+    for i, (name, path) in enumerate(zip(listing.entries, paths)):
+        if checker.is_ignored(path) or (not prefix and name == ".git"):
+            continue
+        (dirs if listing.is_dir(i) else files).append(name)
+    if len(dirs) + len(files) == len(listing):
+        return listing
+    return DirectoryListing(listing.path, dirs, files, listing.key)
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+# Directory listings for the path pickers.
+#
+# A directory is read with a single os.scandir pass. DirEntry.is_dir() and
+# DirEntry.is_file() answer from the d_type returned by readdir, so no stat is
+# issued per entry (except for symlinks and filesystems that report DT_UNKNOWN).
+# Listings are cached per directory and revalidated with one stat of the
+# directory itself: creating, removing or renaming an entry bumps its mtime.
+#
+# Where inotify is available (commit_helper/watch.py) a scanned directory is
+# watched as well. Its cached listing is then patched as entries come and go
+# and handed out without even the stat; when the watch limit is reached the
+# cache falls back to the stat.
+#
+# The pickers also read ahead: while the user moves through a menu, the
+# highlighted directory and a few of its neighbours are scanned into the cache
+# by a couple of worker threads, so diving in finds the listing ready. Each
+# move supersedes the previous request; scans not started yet are dropped.
+
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from commit_helper.watch import CREATED, DELETED, GONE, OVERFLOW, get_watcher
+
+
+class DirectoryListing:
+    __slots__ = ("path", "entries", "num_dirs", "key")
+
+    def __init__(self, path, dirs, files, key):
+        self.path = path
+        self.entries = dirs + files  # Directories first, then files
+        self.num_dirs = len(dirs)
+        self.key = key
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_dir(self, index):
+        return 0 <= index < self.num_dirs
+
+    # Copy with name added as a directory or file (kind "dir" or "file"), or
+    # removed (kind None)
+    def patched(self, name, kind):
+        dirs = [entry for entry in self.entries[: self.num_dirs] if entry != name]
+        files = [entry for entry in self.entries[self.num_dirs :] if entry != name]
+        if kind == "dir":
+            dirs.append(name)
+        elif kind == "file":
+            files.append(name)
+        return DirectoryListing(self.path, dirs, files, self.key)
+
+
+# Identify a version of a directory without reading it
+def directory_key(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns)
+
+
+# Read a directory in one pass, splitting directories from regular files
+def scan_directory(path):
+    dirs = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                # Dangling symlink or entry removed while scanning
+                continue
+    return dirs, files
+
+
+class ListingCache:
+    def __init__(self, max_dirs=512):
+        self.max_dirs = max_dirs
+        self._listings = OrderedDict()
+        self._scanning = {}  # Path -> Event set when its scan is done
+        self._current = set()  # Paths whose listing the watcher keeps up to date
+        self._raced = set()  # Paths that changed while being scanned
+        self._subscribed = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Return the cached listing if the directory has not changed, else rescan it
+    def get(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is not None and path in self._current:
+                self._listings.move_to_end(path)
+                self.hits += 1
+                return listing
+        try:
+            key = directory_key(path)
+        except OSError:
+            self.invalidate(path)
+            return DirectoryListing(path, [], [], None)
+
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is not None and listing.key == key:
+                self._listings.move_to_end(path)
+                self.hits += 1
+                return listing
+            scanning = self._scanning.get(path)
+            if scanning is None:
+                done = self._scanning[path] = threading.Event()
+
+        if scanning is not None:
+            # A prefetch is reading it already: a second scandir would not be faster
+            scanning.wait()
+            return self.get(path)
+        try:
+            watched = self._watch(path)  # Before the scan, so no change slips in between
+            try:
+                dirs, files = scan_directory(path)
+            except OSError:
+                # PermissionError, or the directory vanished between stat and scan
+                return DirectoryListing(path, [], [], None)
+            listing = DirectoryListing(path, dirs, files, key)
+            self.misses += 1
+            self.put(listing)
+            with self._lock:
+                if watched and path not in self._raced:
+                    self._current.add(path)
+            return listing
+        finally:
+            with self._lock:
+                del self._scanning[path]
+                self._raced.discard(path)
+            done.set()
+
+    def put(self, listing):
+        with self._lock:
+            self._listings[listing.path] = listing
+            self._listings.move_to_end(listing.path)
+            while len(self._listings) > self.max_dirs:
+                self._current.discard(self._listings.popitem(last=False)[0])
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._listings.clear()
+                self._current.clear()
+            else:
+                self._listings.pop(os.path.abspath(path), None)
+                self._current.discard(os.path.abspath(path))
+
+    def _watch(self, path):
+        watcher = get_watcher()
+        if watcher is None:
+            return False
+        if not self._subscribed:
+            self._subscribed = True
+            watcher.subscribe(self._changed)
+        return watcher.watch(path)
+
+    # Watcher event: patch the listing of directory rather than dropping it
+    def _changed(self, kind, directory, name, is_dir):
+        if kind == OVERFLOW:
+            self.invalidate()
+            return
+        if kind == GONE:
+            self.invalidate(directory)
+            return
+        if kind not in (CREATED, DELETED):
+            return
+        entry_kind = None
+        if kind == CREATED:
+            # Classify as scan_directory does: symlinks count as what they point to
+            full = os.path.join(directory, name)
+            entry_kind = "dir" if os.path.isdir(full) else "file" if os.path.isfile(full) else None
+        with self._lock:
+            if directory in self._scanning:
+                self._raced.add(directory)
+            listing = self._listings.get(directory)
+            if listing is not None:
+                self._listings[directory] = listing.patched(name, entry_kind)
+
+
+class ListingPrefetcher:
+    def __init__(self, cache, workers=2, budget=6):
+        self.cache = cache
+        self.workers = workers
+        self.budget = budget  # Directories read ahead per request
+        self.generation = 0
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+
+    def _work(self):
+        while True:
+            generation, path = self._queue.get()
+            if generation == self.generation:  # Else the selection moved on
+                self.cache.get(path)
+
+    # Read paths into the cache in the background, most wanted first,
+    # dropping whatever an earlier call queued and nobody started yet
+    def prefetch(self, paths):
+        if not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name="listing-prefetch-%d" % i, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self.generation += 1
+        for path in paths[: self.budget]:
+            self._queue.put((self.generation, path))
+
+    def cancel(self):
+        self.generation += 1
+
+
+# Cache shared by every picker in the process
+LISTING_CACHE = ListingCache()
+PREFETCHER = ListingPrefetcher(LISTING_CACHE)
+
+
+def list_directory(path):
+    return LISTING_CACHE.get(path)
+
+
+# Directories of listing worth reading ahead with the entry at index
+# highlighted: that one, then its nearest neighbours
+def directories_near(listing, index, budget):
+    if not listing.is_dir(index):
+        return []
+    paths = []
+    for distance in range(listing.num_dirs):
+        for i in (index + distance, index - distance) if distance else (index,):
+            if listing.is_dir(i) and len(paths) < budget:
+                paths.append(os.path.join(listing.path, listing.entries[i]))
+        if len(paths) >= budget:
+            break
+    return paths
+
+
+def prefetch_near(listing, index):
+    PREFETCHER.prefetch(directories_near(listing, index, PREFETCHER.budget))
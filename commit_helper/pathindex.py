@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+# In-memory index of repository paths for the fuzzy finder.
+#
+# The lowercased paths are sorted once, shortest first, and joined into
+# newline separated blobs of CHUNK paths each, with a parallel array of line
+# offsets per blob. A query is then a C-level regex scan of the blobs instead
+# of a Python loop over every path, and because the blobs are already in rank
+# order the scan stops as soon as it has enough results. Results come in two
+# tiers:
+#
+#   1. the query appears verbatim in the basename      (regex: abc[^/\n]*$)
+#   2. the query characters appear in order anywhere   (regex: a[^b\n]*b[^c\n]*c)
+#
+# The tier 2 pattern matches deterministically, without backtracking. When a
+# scan has to run to the end the result set is small, and the next keystroke
+# (which refines the query) only rescans those paths. The blobs are built with
+# the index, which prewarm_path_index() does on a thread while the user types,
+# and a change to the paths rebuilds only the blob that holds them.
+#
+# git ls-files runs once per session. Afterwards RepoPaths keeps the list
+# current from the directory watcher (commit_helper/watch.py): every
+# directory holding a listed file is watched, files created outside ignored
+# directories are added and deleted ones dropped, and the fuzzy finder and
+# path completion apply just those changes. The watches are set up on a
+# thread, so the first Tab or Ctrl-P does not wait for them. Directories
+# that cannot be watched (no inotify, the watch limit reached, or the watcher
+# thread stopped) are checked by mtime instead, one stat each and only the
+# changed ones read again, on a thread and at most every REVALIDATE_EVERY
+# seconds: a Tab never waits for thousands of stats, and what they find shows
+# up on a later one. A path list
+# that comes from the helper daemon (commit_helper/daemon.py) is not watched
+# here at all, which would double the watches per user: it is fetched again on
+# the same schedule instead, and watched only if the daemon stops answering.
+
+import os
+import re
+import subprocess
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice
+
+from commit_helper.ignore import get_ignore_checker
+from commit_helper.listing import directory_key
+from commit_helper.watch import CREATED, DELETED, OVERFLOW, get_watcher
+
+CHANGE_LOG = 32  # Batches of changes kept for indexes that are behind
+CHUNK = 1024  # Paths per blob of a PathIndex
+REVALIDATE_EVERY = 2.0  # Seconds between mtime checks of unwatched directories
+
+
+# List tracked and untracked (but not ignored) files relative to cwd
+def load_repo_paths(cwd=None):
+    try:
+        out = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    # Files that are both in the index and modified are listed once per section
+    return list(dict.fromkeys(p for p in out.decode("utf-8", "surrogateescape").split("\0") if p))
+
+
+def _basename_pattern(query):
+    return re.compile(re.escape(query) + r"[^/\n]*$", re.MULTILINE)
+
+
+def _fuzzy_pattern(query):
+    parts = []
+    for ch, following in zip(query, query[1:]):
+        parts.append(re.escape(ch) + "[^%s\\n]*" % re.escape(following))
+    parts.append(re.escape(query[-1]))
+    return re.compile("".join(parts))
+
+
+def _rank(path):
+    return (len(path), path)
+
+
+class _Chunk:
+    __slots__ = ("paths", "blob", "offsets")
+
+    def __init__(self, paths):
+        self.paths = paths
+        lowered = list(map(str.lower, paths))  # Not always as long as the path
+        self.blob = "\n".join(lowered)
+        self.offsets = list(accumulate(map((1).__add__, map(len, lowered)), initial=0))
+
+    # Yield the paths of the lines matching pattern, in blob order, once each
+    def scan(self, pattern):
+        paths = self.paths
+        offsets = self.offsets
+        last = -1
+        for m in pattern.finditer(self.blob):
+            line = bisect_right(offsets, m.start()) - 1
+            if line != last:
+                last = line
+                yield paths[line]
+
+
+def _chunked(paths):
+    return [_Chunk(paths[i : i + CHUNK]) for i in range(0, len(paths), CHUNK)]
+
+
+def _scan(chunks, pattern):
+    for chunk in chunks:
+        yield from chunk.scan(pattern)
+
+
+class PathIndex:
+    def __init__(self, paths):
+        paths = sorted(paths)
+        paths.sort(key=len)  # Stable, so in _rank order without a key tuple per path
+        self._chunks = _chunked(paths)
+        self._count = len(paths)
+        self._narrowed_query = None
+        self._narrowed = None
+        self.version = 0  # Of the RepoPaths it reflects
+
+    def __len__(self):
+        return self._count
+
+    # The chunk that holds path, or would
+    def _chunk_of(self, path):
+        chunks = self._chunks
+        i = bisect_left(chunks, _rank(path), key=lambda chunk: _rank(chunk.paths[-1]))
+        return chunks[min(i, len(chunks) - 1)]
+
+    # Apply a batch of changes in place, rebuilding only the blobs they touch.
+    # Adding a listed path or removing an unlisted one does nothing.
+    def update(self, added, removed):
+        touched = set()
+        for path in removed:
+            if not self._chunks:
+                break
+            chunk = self._chunk_of(path)
+            i = bisect_left(chunk.paths, _rank(path), key=_rank)
+            if i < len(chunk.paths) and chunk.paths[i] == path:
+                del chunk.paths[i]
+                touched.add(chunk)
+                self._count -= 1
+                if not chunk.paths:
+                    self._chunks.remove(chunk)
+        for path in added:
+            if not self._chunks:
+                self._chunks.append(_Chunk([path]))
+                touched.add(self._chunks[0])
+                self._count += 1
+                continue
+            chunk = self._chunk_of(path)
+            i = bisect_left(chunk.paths, _rank(path), key=_rank)
+            if i == len(chunk.paths) or chunk.paths[i] != path:
+                chunk.paths.insert(i, path)
+                touched.add(chunk)
+                self._count += 1
+        if touched:
+            self._chunks = [
+                rebuilt
+                for chunk in self._chunks
+                for rebuilt in (self._rebuilt(chunk) if chunk in touched else (chunk,))
+            ]
+        self._narrowed_query = None
+        self._narrowed = None
+
+    # The blobs for the paths of a changed chunk, split once it doubled
+    @staticmethod
+    def _rebuilt(chunk):
+        return _chunked(chunk.paths) if len(chunk.paths) > 2 * CHUNK else (_Chunk(chunk.paths),)
+
+    # Ranked paths containing the characters of query in order
+    def search(self, query, limit=50):
+        query = "".join(query.lower().split())
+        if not query:
+            return list(islice(chain.from_iterable(chunk.paths for chunk in self._chunks), limit))
+
+        scope = self._chunks
+        if self._narrowed_query is not None and query.startswith(self._narrowed_query):
+            scope = self._narrowed
+
+        results = []
+        for path in _scan(scope, _basename_pattern(query)):
+            results.append(path)
+            if len(results) == limit:
+                return results
+
+        seen = set(results)
+        matched = []
+        for path in _scan(scope, _fuzzy_pattern(query)):
+            matched.append(path)
+            if path not in seen:
+                results.append(path)
+                if len(results) == limit:
+                    return results
+
+        # The whole scope was scanned, so matched is every path for this query
+        self._narrowed_query = query
+        self._narrowed = _chunked(matched)
+        return results
+
+
+class RepoPaths:
+    def __init__(self, cwd, paths=None, fetch=None):
+        self.cwd = cwd
+        self.paths = load_repo_paths(cwd) if paths is None else paths
+        self.fetch = fetch  # Returns the current paths from elsewhere, in place of watching
+        self.version = 0
+        self._present = set(self.paths)
+        self._log = []  # (version, added, removed), oldest first
+        self._queued = []  # (path, present) from the watcher thread; "dir/" stands for a subtree
+        self._stale = False  # Events were lost: run ls-files again
+        self._unwatched = {}  # Directory -> key, for directories checked by mtime
+        self._revalidating = None  # Thread running the mtime checks or the fetch
+        self._revalidated_at = None
+        self._lock = threading.Lock()
+        self._watching = threading.Thread(target=self._watch_directories, args=(self.paths,),
+                                          name="path-watches", daemon=True)
+        if fetch is None:
+            self._watching.start()
+
+    def _absolute(self, directory):
+        return os.path.join(self.cwd, directory) if directory else self.cwd
+
+    def _watch_directories(self, paths, subscribe=True):
+        directories = {""}
+        for path in paths:
+            slash = path.rfind("/")
+            while slash > 0 and path[:slash] not in directories:
+                directories.add(path[:slash])
+                slash = path.rfind("/", 0, slash)
+        watcher = get_watcher()
+        if watcher is not None and subscribe:
+            watcher.subscribe(self._changed)
+        for directory in directories:
+            self._watch(watcher, directory)
+
+    def _watch(self, watcher, directory):
+        if watcher is not None and watcher.watch(self._absolute(directory)):
+            return
+        try:
+            key = directory_key(self._absolute(directory))
+        except OSError:
+            return
+        with self._lock:
+            self._unwatched[directory] = key
+
+    def _relative(self, directory, name):
+        if directory == self.cwd:
+            return name
+        if not directory.startswith(self.cwd + os.sep):
+            return None
+        return directory[len(self.cwd) + 1 :].replace(os.sep, "/") + "/" + name
+
+    # Watcher thread: queue what changed under cwd
+    def _changed(self, kind, directory, name, is_dir):
+        if kind == OVERFLOW:
+            self._stale = True
+            return
+        if kind not in (CREATED, DELETED):
+            return
+        path = self._relative(directory, name)
+        if path is None or path == ".git" or path.startswith(".git/"):
+            return
+        if kind == DELETED:
+            self._queue([(path + "/" if is_dir else path, False)])
+        else:
+            self._queue([(p, True) for p in self._new_files(path)])
+
+    def _queue(self, changes):
+        with self._lock:
+            self._queued.extend(changes)
+
+    # Files at or below path (relative to cwd) that git does not ignore,
+    # watching the directories on the way down
+    def _new_files(self, path):
+        checker = get_ignore_checker(self.cwd)
+        checker.check([path])
+        if checker.is_ignored(path):
+            return []
+        full = self._absolute(path)
+        if not os.path.isdir(full) or os.path.islink(full):
+            return [path] if os.path.lexists(full) else []
+        self._watch(get_watcher(), path)  # Before reading, so nothing created meanwhile is missed
+        files = []
+        try:
+            with os.scandir(full) as it:
+                names = [entry.name for entry in it]
+        except OSError:
+            return []
+        for name in names:
+            files.extend(self._new_files(path + "/" + name))
+        return files
+
+    # Is every directory watched, so that no change can go unnoticed?
+    def fully_watched(self):
+        watcher = get_watcher()
+        return (self.fetch is None and watcher is not None and not watcher.stopped
+                and not self._watching.is_alive() and not self._unwatched and not self._stale)
+
+    # Changes in the directories checked by mtime, as (path, present)
+    def _revalidate(self):
+        with self._lock:
+            unwatched = list(self._unwatched.items())
+        present = self._present  # Replaced, never changed, by sync()
+        changes = []
+        for directory, key in unwatched:
+            full = self._absolute(directory)
+            prefix = directory + "/" if directory else ""
+            try:
+                if directory_key(full) == key:
+                    continue
+                names = set(os.listdir(full))
+                key = directory_key(full)
+            except OSError:
+                with self._lock:
+                    self._unwatched.pop(directory, None)
+                changes.append((prefix, False))
+                continue
+            with self._lock:
+                self._unwatched[directory] = key
+            if not directory:
+                names.discard(".git")
+            # Only the entries of the directory itself can have changed
+            known = {p[len(prefix) :].split("/", 1)[0] for p in present if p.startswith(prefix)}
+            for name in known - names:
+                changes.append((prefix + name, False))
+                changes.append((prefix + name + "/", False))
+            for name in names - known:
+                changes.extend((p, True) for p in self._new_files(prefix + name))
+        return changes
+
+    # Changes since the paths were last fetched, as (path, present). If the
+    # fetch fails the directories are watched from now on, starting from a
+    # fresh ls-files.
+    def _refetch(self):
+        try:
+            paths = set(self.fetch())
+        except (OSError, ValueError):
+            self.fetch = None
+            self._watching.start()
+            self._stale = True
+            return []
+        present = self._present
+        return [(p, False) for p in present - paths] + [(p, True) for p in paths - present]
+
+    # Queue the changes found by the mtime checks or a new fetch from a
+    # thread, unless one is running or the last one is recent
+    def _start_revalidate(self):
+        if self.fetch is None and not self._unwatched:
+            return
+        if self._revalidating is not None and self._revalidating.is_alive():
+            return
+        now = time.monotonic()
+        if self._revalidated_at is not None and now - self._revalidated_at < REVALIDATE_EVERY:
+            return
+        self._revalidated_at = now
+        check = self._refetch if self.fetch is not None else self._revalidate
+        self._revalidating = threading.Thread(target=lambda: self._queue(check()), name="path-revalidate", daemon=True)
+        self._revalidating.start()
+
+    # Bring paths up to date (UI thread); True if anything changed
+    def sync(self):
+        if self._stale:
+            self._stale = False
+            with self._lock:
+                self._queued = []
+            self.paths = load_repo_paths(self.cwd)
+            self._present = set(self.paths)
+            self._log = []  # Nothing to catch up from: indexes are rebuilt
+            self.version += 1
+            watcher = get_watcher()
+            if self.fetch is None and watcher is not None and watcher.stopped and not self._watching.is_alive():
+                # The watches went with the watcher thread: check every directory by mtime
+                self._watching = threading.Thread(target=self._watch_directories, args=(self.paths, False),
+                                                  name="path-watches", daemon=True)
+                self._watching.start()
+            return True
+        self._start_revalidate()
+        with self._lock:
+            changes, self._queued = self._queued, []
+        added = set()
+        removed = set()
+        for path, present in changes:
+            if path.endswith("/") or path == "":
+                gone = {p for p in self._present if p.startswith(path)}
+                removed |= gone
+                added -= gone
+            elif present:
+                added.add(path)
+                removed.discard(path)
+            else:
+                removed.add(path)
+                added.discard(path)
+        added -= self._present
+        removed &= self._present
+        if not added and not removed:
+            return False
+        self._present = (self._present | added) - removed
+        self.paths = [p for p in self.paths if p not in removed] + sorted(added)
+        self.version += 1
+        self._log.append((self.version, added, removed))
+        del self._log[:-CHANGE_LOG]
+        return True
+
+    # Combined (added, removed) since version, or None if that is too far back
+    def changes_since(self, version):
+        batches = [(added, removed) for v, added, removed in self._log if v > version]
+        if len(batches) != self.version - version:
+            return None
+        added, removed = set(), set()
+        for batch_added, batch_removed in batches:
+            added = (added - batch_removed) | batch_added
+            removed = (removed - batch_added) | batch_removed
+        return added, removed
+
+
+_PATHS = {}
+_INDEXES = {}
+_PATHS_LOCK = threading.Lock()  # One RepoPaths per directory, even with a seed thread
+
+
+# RepoPaths of cwd: git ls-files runs once per session, later calls catch up
+def get_repo_paths(cwd):
+    with _PATHS_LOCK:
+        repo_paths = _PATHS.get(cwd)
+        if repo_paths is None:
+            repo_paths = _PATHS[cwd] = RepoPaths(cwd)
+            return repo_paths
+    repo_paths.sync()
+    return repo_paths
+
+
+# The RepoPaths of cwd if anything built it yet, else None
+def peek_repo_paths(cwd):
+    return _PATHS.get(cwd)
+
+
+# Start from paths listed elsewhere (see commit_helper/daemon.py), kept
+# current with fetch() instead of watches, or from ls-files with paths None,
+# unless that already happened; returns the RepoPaths in use without catching
+# it up, so any thread may call it
+def seed_repo_paths(cwd, paths, fetch=None):
+    with _PATHS_LOCK:
+        repo_paths = _PATHS.get(cwd)
+        if repo_paths is None:
+            repo_paths = _PATHS[cwd] = RepoPaths(cwd, paths, fetch)
+    return repo_paths
+
+
+class _Prewarm:
+    def __init__(self, cwd, seed):
+        self.cwd = cwd
+        self.seed = seed  # Seeds the RepoPaths from elsewhere first, or None
+        self.index = None
+        self._thread = threading.Thread(target=self._run, name="path-index", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        if self.seed is not None:
+            self.seed()
+        repo_paths = seed_repo_paths(self.cwd, None)
+        # The paths are at least this new; catching up again changes nothing
+        version = repo_paths.version
+        index = PathIndex(repo_paths.paths)
+        index.version = version
+        self.index = index
+
+    def wait(self):
+        self._thread.join()
+
+
+_PREWARMS = {}
+
+
+# Build the fuzzy finder index of cwd on a thread while the user types, so
+# the first Ctrl-P does not wait for it; seed() runs first on that thread
+def prewarm_path_index(cwd, seed=None):
+    if cwd not in _PREWARMS and cwd not in _INDEXES:
+        _PREWARMS[cwd] = _Prewarm(cwd, seed)
+
+
+def get_path_index(cwd):
+    prewarm = _PREWARMS.pop(cwd, None)
+    if prewarm is not None:
+        prewarm.wait()
+        if prewarm.index is not None:
+            _INDEXES[cwd] = prewarm.index
+    repo_paths = get_repo_paths(cwd)
+    index = _INDEXES.get(cwd)
+    if index is not None and index.version != repo_paths.version:
+        changes = repo_paths.changes_since(index.version)
+        if changes is None:
+            index = None
+        else:
+            index.update(*changes)
+    if index is None:
+        index = _INDEXES[cwd] = PathIndex(repo_paths.paths)
+    index.version = repo_paths.version
+    return index
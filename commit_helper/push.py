@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# git push on a worker thread.
+#
+# The worker only runs the process and queues its output; the UI thread drains
+# the queue (curses must only be touched from one thread), so the screen stays
+# live while the push waits on the network and Esc can cancel it.
+#
+# The push runs in a session of its own (see _kill), without the terminal.
+# Anything that would prompt on /dev/tty is told not to: git gets
+# GIT_TERMINAL_PROMPT=0, and ssh cannot open a terminal and gives up. Such a
+# push fails with needs_terminal set, and the caller runs it again on the
+# terminal with curses suspended, where git and ssh can ask as they always
+# did. Credential helpers and ssh agents work in the background either way.
+
+import os
+import queue
+import signal
+import threading
+import time
+
+from commit_helper.stream import stream_command
+
+PUSH_COMMAND = ["git", "push", "--progress"]
+
+RUNNING = "running"
+PUSHED = "pushed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Output of a push that stopped because it could not ask for credentials
+AUTH_FAILURES = ("terminal prompts disabled", "could not read Username", "could not read Password",
+                 "Permission denied (publickey", "Host key verification failed", "Authentication failed")
+
+
+class BackgroundPush:
+    def __init__(self, command=PUSH_COMMAND, cwd=None):
+        self.command = command
+        self.cwd = cwd
+        self.lines = queue.SimpleQueue()  # (stream name, line, overwrite)
+        self.state = RUNNING
+        self.returncode = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.needs_terminal = False  # It failed for want of a credential prompt
+        self._process = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="git-push", daemon=True)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def _on_start(self, process):
+        with self._lock:
+            self._process = process
+            if self._cancelled:
+                self._kill()
+
+    def _on_line(self, stream, line, overwrite):
+        if any(failure in line for failure in AUTH_FAILURES):
+            self.needs_terminal = True
+        self.lines.put((stream, line, overwrite))
+
+    def _run(self):
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0", SSH_ASKPASS_REQUIRE="never")
+        try:
+            self.returncode = stream_command(self.command, self._on_line, cwd=self.cwd, env=env,
+                                             on_start=self._on_start, start_new_session=True)
+        except Exception as e:
+            self.error = e
+        self.finished_at = time.monotonic()
+        if self._cancelled:
+            self.state = CANCELLED
+        elif self.error is None and self.returncode == 0:
+            self.state = PUSHED
+        else:
+            self.state = FAILED
+
+    # The push runs in its own session so this also reaches the helpers it
+    # spawned (ssh, a local receive-pack and its hooks), which would otherwise
+    # keep the output pipes open
+    def _kill(self):
+        try:
+            os.killpg(self._process.pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._process is not None and self._process.poll() is None:
+                self._kill()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def done(self):
+        return self.state != RUNNING
+
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    # Queued output lines, without blocking
+    def drain(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.lines.get_nowait())
+            except queue.Empty:
+                return lines
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.state
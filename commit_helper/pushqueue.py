@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# Deferred pushes, coalesced across invocations.
+#
+# Instead of pushing after every commit, the helper appends the commit to a
+# queue file under .git/ and makes sure a detached worker is running. The
+# worker waits until nothing has been queued for the idle window, then pushes
+# each destination once, however many commits piled up, retrying with
+# exponential backoff. Entries are only removed once their push succeeded.
+#
+# The destination (remote and remote branch) is resolved when the commit is
+# queued, as a plain `git push` would resolve it then, and the worker pushes
+# `<commit>:<ref>` explicitly. Switching branches during the idle window
+# therefore neither pushes the new branch nor loses the queued commits.
+#
+#   python -m commit_helper.pushqueue status    show what is queued
+#   python -m commit_helper.pushqueue flush     push now, without waiting
+#
+# Two flocks keep this safe across processes: QUEUE_FILE.lock guards the queue
+# file itself, and QUEUE_FILE.worker is held by the one running worker.
+
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+
+QUEUE_FILE = "commit-helper-push-queue"
+LOG_FILE = "commit-helper-push.log"
+DEFAULT_IDLE = 30.0  # Seconds without new commits before pushing
+RETRIES = 5
+BACKOFF = 2.0  # First retry delay, doubled after every failure
+MAX_BACKOFF = 120.0
+MAX_LOG = 64 * 1024
+
+
+class _Flock:
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.fd = None
+
+    def acquire(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(self.fd)
+            self.fd = None
+            return False
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)  # Closing drops the lock
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def queue_path(common_dir):
+    return os.path.join(common_dir, QUEUE_FILE)
+
+
+# Entries are JSON lines: {"worktree", "commit", "branch", "remote", "ref",
+# "queued", "idle"}
+def read_queue(common_dir):
+    try:
+        with open(queue_path(common_dir)) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue  # A torn line from a crash; the commit is still in git
+    return entries
+
+
+def _write_queue(common_dir, entries):
+    path = queue_path(common_dir)
+    if not entries:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    os.replace(tmp, path)
+
+
+def _queue_lock(common_dir):
+    return _Flock(queue_path(common_dir) + ".lock")
+
+
+def _worker_lock(common_dir):
+    return _Flock(queue_path(common_dir) + ".worker", blocking=False)
+
+
+def _git(worktree, *args):
+    result = subprocess.run(["git"] + list(args), cwd=worktree, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return result.stdout.strip()
+
+
+# (branch, remote, remote ref) a plain `git push` would update right now.
+# The remote branch is read back from its remote-tracking name, assuming the
+# usual refs/remotes/<remote>/* fetch refspec.
+def push_target(worktree):
+    branch = _git(worktree, "symbolic-ref", "-q", "HEAD")
+    if not branch.startswith("refs/heads/"):
+        raise ValueError("HEAD is detached: there is no branch to push later")
+    # Neither a remote nor a ref name can contain a space
+    name, _, tracking = _git(worktree, "for-each-ref", "--format=%(push:remotename) %(push)", branch).rpartition(" ")
+    remotes = [name] if name else sorted(_git(worktree, "remote").split(), key=len, reverse=True)
+    for remote in remotes:
+        prefix = "refs/remotes/%s/" % remote
+        if tracking.startswith(prefix):
+            return branch, remote, "refs/heads/" + tracking[len(prefix):]
+    raise ValueError("No push destination for %s; push it once with `git push -u`" % branch[len("refs/heads/"):])
+
+
+# Record the commit at HEAD and where it goes to push later, and make sure a
+# worker will push it. Raises ValueError if git push would not know where to.
+def enqueue(repo, idle=DEFAULT_IDLE):
+    commit = _git(repo.worktree, "rev-parse", "HEAD")
+    branch, remote, ref = push_target(repo.worktree)
+    entry = {"worktree": repo.worktree, "commit": commit, "branch": branch, "remote": remote, "ref": ref,
+             "queued": time.time(), "idle": idle}
+    with _queue_lock(repo.common_dir):
+        with open(queue_path(repo.common_dir), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    ensure_worker(repo.common_dir)
+    return entry
+
+
+# Start a detached worker unless one is already running. The worker only lets
+# go of its lock while holding the queue lock and seeing an empty queue, so an
+# entry appended before this check is always picked up by someone.
+def ensure_worker(common_dir):
+    probe = _worker_lock(common_dir)
+    if not probe.acquire():
+        return False
+    probe.release()
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (package_root, env.get("PYTHONPATH")) if p)
+    subprocess.Popen([sys.executable, "-m", "commit_helper.pushqueue", "worker", common_dir],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     cwd=common_dir, env=env, start_new_session=True)
+    return True
+
+
+def _log(common_dir, text):
+    path = os.path.join(common_dir, LOG_FILE)
+    try:
+        if os.path.getsize(path) > MAX_LOG:
+            os.replace(path, path + ".old")
+    except OSError:
+        pass
+    with open(path, "a") as f:
+        f.write(time.strftime("%Y-%m-%d %H:%M:%S ") + text.rstrip("\n") + "\n")
+
+
+# Where an entry goes; entries queued by older versions only know the worktree
+def _target(entry):
+    return entry["worktree"], entry.get("remote"), entry.get("ref")
+
+
+def _push(common_dir, target, commit):
+    worktree, remote, ref = target
+    command = ["git", "push"] + ([remote, "%s:%s" % (commit, ref)] if ref else [])
+    try:
+        result = subprocess.run(command, cwd=worktree, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except OSError as e:
+        _log(common_dir, "%s in %s: %s" % (" ".join(command), worktree, e))
+        return False
+    _log(common_dir, "%s in %s exited with %d\n%s" % (" ".join(command), worktree, result.returncode, result.stdout))
+    return result.returncode == 0
+
+
+# Push the newest queued commit of every destination once; returns the
+# destinations that failed
+def push_queued(common_dir, entries):
+    newest = {}
+    for entry in sorted(entries, key=lambda e: e["queued"]):
+        newest[_target(entry)] = entry["commit"]
+    failed = {target for target, commit in newest.items() if not _push(common_dir, target, commit)}
+    pushed = {id(entry) for entry in entries if _target(entry) not in failed}
+    # Drop what was pushed, keeping anything queued meanwhile
+    with _queue_lock(common_dir):
+        done = {(e["worktree"], e["commit"], e["queued"]) for e in entries if id(e) in pushed}
+        _write_queue(common_dir, [e for e in read_queue(common_dir)
+                                  if (e["worktree"], e["commit"], e["queued"]) not in done])
+    return failed
+
+
+def run_worker(common_dir, wait=True):
+    lock = _worker_lock(common_dir)
+    if not lock.acquire():
+        return 0  # Someone else is on it
+    failures = 0
+    try:
+        while True:
+            with _queue_lock(common_dir):
+                entries = read_queue(common_dir)
+                if not entries:
+                    lock.release()
+                    return 0
+            if wait:
+                last = max(entries, key=lambda e: e["queued"])
+                remaining = last["queued"] + last.get("idle", DEFAULT_IDLE) - time.time()
+                if remaining > 0:
+                    time.sleep(remaining)
+                    continue  # More may have been queued meanwhile
+            if not push_queued(common_dir, entries):
+                failures = 0
+                continue
+            failures += 1
+            if failures > RETRIES:
+                _log(common_dir, "giving up after %d attempts; commits stay queued" % failures)
+                return 1
+            time.sleep(min(BACKOFF * 2 ** (failures - 1), MAX_BACKOFF))
+    finally:
+        lock.release()
+
+
+def main(argv=None):
+    from commit_helper.repo import get_repository
+
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "status"
+    if command == "worker" and len(argv) == 2:
+        return run_worker(argv[1])
+    repo = get_repository()
+    if repo is None:
+        print("Not a git repository", file=sys.stderr)
+        return 1
+    if command == "status":
+        entries = read_queue(repo.common_dir)
+        for entry in entries:
+            destination = "%s %s" % (entry["remote"], entry["ref"]) if entry.get("ref") else "(upstream)"
+            print("%s  %s  %s  queued %s" % (entry["commit"][:12], entry["worktree"], destination,
+                                             time.strftime("%H:%M:%S", time.localtime(entry["queued"]))))
+        print("%d commit(s) queued" % len(entries))
+        return 0
+    if command == "flush":
+        return run_worker(repo.common_dir, wait=False)
+    print("usage: python -m commit_helper.pushqueue [status|flush]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# Batched terminal output.
+#
+# Drawing code never calls refresh(). It stages the windows it touched with
+# noutrefresh(), which only updates curses' picture of the screen, and
+# read_key() sends everything to the terminal in a single doupdate() right
+# before blocking for input. Menus are drawn in their own Popup windows, so
+# closing one restores what was beneath it from curses' copy instead of
+# having the caller clear and redraw those lines; doupdate() then only sends
+# the cells that actually differ. Git output goes to an OutputPane that never
+# writes past the bottom of the screen; it flushes by itself while output
+# streams in, since nothing reads a key until the command is done.
+
+import curses
+import os
+import time
+
+from commit_helper.stream import Scrollback
+
+
+class OutputMeter:
+    # Bytes written by the calling thread, from /proc/thread-self/io (Linux).
+    # Sampled around doupdate(), which only writes to the terminal, this is
+    # what reaches the tty: writes other threads make meanwhile (the title
+    # index, the check-ignore pipe) are counted against their own threads.
+    def __init__(self, proc_io="/proc/thread-self/io"):
+        self.proc_io = proc_io if os.path.exists(proc_io) else None
+        self.flushes = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.seconds = 0.0
+
+    def written(self):
+        if self.proc_io is None:
+            return 0
+        with open(self.proc_io) as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+        return 0
+
+    def record(self, count, seconds):
+        self.flushes += 1
+        self.bytes += count
+        self.max_bytes = max(self.max_bytes, count)
+        self.seconds += seconds
+
+    def summary(self):
+        if self.proc_io is None:
+            return "terminal output not measured (no /proc/thread-self/io)"
+        average = self.bytes / self.flushes if self.flushes else 0
+        return "updates: %d, bytes to tty: %d (avg %.1f, max %d per update), %.1f ms in doupdate" % (
+            self.flushes, self.bytes, average, self.max_bytes, self.seconds * 1000)
+
+
+OUTPUT_METER = OutputMeter()
+
+
+# Send every staged change to the terminal at once
+def flush():
+    start_bytes = OUTPUT_METER.written()
+    start = time.perf_counter()
+    curses.doupdate()
+    OUTPUT_METER.record(OUTPUT_METER.written() - start_bytes, time.perf_counter() - start)
+
+
+# Stage window last, so the terminal cursor ends up at its cursor, and flush
+def present(window):
+    window.noutrefresh()
+    flush()
+
+
+# Flush all pending output, then wait for a key in window
+def read_key(window):
+    present(window)
+    return window.getch()
+
+
+_open_popups = []
+
+
+# A window drawn over the screen, e.g. a menu. Closing it stages the windows
+# beneath again so curses can restore the covered cells.
+class Popup:
+    def __init__(self, stdscr, y, x, height=None, width=None):
+        self.stdscr = stdscr
+        self.y = y
+        self.x = x
+        self.want_height = height
+        self.want_width = width
+        stdscr.noutrefresh()  # Keep what was drawn beneath before covering it
+        self.win = curses.newwin(*self._geometry())
+        self.win.keypad(True)
+        _open_popups.append(self)
+
+    def _geometry(self):
+        max_y, max_x = self.stdscr.getmaxyx()
+        y = min(self.y, max_y - 1)
+        x = min(self.x, max_x - 1)
+        height = max_y - y if self.want_height is None else min(self.want_height, max_y - y)
+        width = max_x - x if self.want_width is None else min(self.want_width, max_x - x)
+        return max(height, 1), max(width, 1), y, x
+
+    @property
+    def height(self):
+        return self.win.getmaxyx()[0]
+
+    @property
+    def width(self):
+        return self.win.getmaxyx()[1]
+
+    # Fit the window to the terminal again after KEY_RESIZE
+    def fit(self, height=None):
+        if height is not None:
+            self.want_height = height
+        height, width, y, x = self._geometry()
+        self.win.resize(height, width)
+        self.win.mvwin(y, x)
+        self.win.erase()
+        restore_screen(self.stdscr)
+
+    def close(self):
+        if self in _open_popups:
+            _open_popups.remove(self)
+        del self.win
+        restore_screen(self.stdscr)
+
+
+# Stage the screen and all open popups, bottom to top
+def restore_screen(stdscr):
+    stdscr.touchwin()
+    stdscr.noutrefresh()
+    for popup in _open_popups:
+        popup.win.touchwin()
+        popup.win.noutrefresh()
+
+
+# A small box of lines in the bottom right corner, clear of the prompts at the
+# top, that other windows may draw over. stage() puts it back on top, so call
+# it after staging the windows beneath; the cursor stays where they left it.
+class SidePanel:
+    def __init__(self, stdscr, width, height):
+        self.stdscr = stdscr
+        max_y, max_x = stdscr.getmaxyx()
+        height, width = min(height, max_y), min(width, max_x)
+        self.win = curses.newwin(height, width, max_y - height, max_x - width)
+        self.lines = []  # (text, attr) per row
+
+    def set_lines(self, lines):
+        if lines == self.lines:
+            return False
+        self.lines = lines
+        height, width = self.win.getmaxyx()
+        self.win.erase()
+        for y, (text, attr) in enumerate(lines[:height]):
+            self.win.addnstr(y, 0, text, width - 1, attr)
+        return True
+
+    def stage(self):
+        y, x = curses.getsyx()
+        self.win.touchwin()
+        self.win.noutrefresh()
+        curses.setsyx(y, x)
+
+    def close(self):
+        del self.win
+        restore_screen(self.stdscr)
+
+
+# Scrolling area for command output below row top. Text lives in a bounded
+# Scrollback and only the rows that fit are drawn and sent to the terminal, at
+# most fps times a second while output streams in. PageUp/PageDown scroll back
+# while waiting for a key.
+class OutputPane:
+    def __init__(self, stdscr, top, capacity=2000, fps=30):
+        self.stdscr = stdscr
+        self.top = top
+        stdscr.noutrefresh()  # The pane only covers rows below top
+        max_y, max_x = stdscr.getmaxyx()
+        self.win = curses.newwin(max(max_y - top, 1), max_x, min(top, max_y - 1), 0)
+        self.win.keypad(True)
+        self.scrollback = Scrollback(capacity)
+        self.progress = None  # Progress shown as a bar on the last row
+        self.status = None  # Shown on the last row when there is no progress
+        self.offset = 0  # Rows scrolled back from the newest output
+        self.interval = 1.0 / fps
+        self.painted_at = 0.0
+        self.dirty = True
+
+    def write(self, text, attr=0):
+        self.scrollback.write(text, attr)
+        self.offset = 0
+        self.dirty = True
+        self.stage()
+
+    # Replace the last line, for output that redraws itself with "\r"
+    def replace_last(self, text, attr=0):
+        self.scrollback.replace_last(text, attr)
+        self.dirty = True
+        self.stage()
+
+    def set_progress(self, progress):
+        self.progress = progress
+        self.dirty = True
+        self.stage()
+
+    def set_status(self, text):
+        if text != self.status:
+            self.status = text
+            self.dirty = True
+            self.stage()
+
+    # Split a line of (text, attr) segments into rows of at most width cells
+    @staticmethod
+    def _wrap(line, width):
+        rows = [[]]
+        used = 0
+        for text, attr in line:
+            while text:
+                if used == width:
+                    rows.append([])
+                    used = 0
+                piece = text[: width - used]
+                rows[-1].append((piece, attr))
+                used += len(piece)
+                text = text[len(piece) :]
+        return rows
+
+    def _paint(self):
+        height, width = self.win.getmaxyx()
+        width = max(width - 1, 1)  # Never write the last column
+        footer = self.progress is not None or self.status is not None
+        room = height - (1 if footer else 0)
+        # Collect just enough rows from the newest lines backwards
+        rows = []
+        skip = self.offset
+        for line in reversed(self.scrollback.lines):
+            wrapped = self._wrap(line, width)
+            rows[:0] = wrapped
+            if len(rows) >= room + skip:
+                break
+        skip = min(skip, max(len(rows) - room, 0))
+        self.offset = skip
+        if skip:
+            rows = rows[: len(rows) - skip]
+        rows = rows[-room:] if room > 0 else []
+
+        self.win.erase()
+        for y, row in enumerate(rows):
+            self.win.move(y, 0)
+            for text, attr in row:
+                self.win.addnstr(text, width, attr)
+        cursor = self.win.getyx()
+        if self.progress is not None:
+            self.win.addnstr(height - 1, 0, self.progress.bar(width), width, curses.A_BOLD)
+        elif self.status is not None:
+            self.win.addnstr(height - 1, 0, self.status, width, curses.A_BOLD)
+        if self.offset:
+            marker = " -- %d more below, PageDown -- " % self.offset
+            self.win.addnstr(height - 1, max(width - len(marker), 0), marker, width, curses.A_REVERSE)
+        self.win.move(*cursor)
+        self.win.noutrefresh()
+        self.dirty = False
+        self.painted_at = time.monotonic()
+
+    # Show the pane if it changed, at most fps times a second unless forced
+    def stage(self, force=False):
+        if self.dirty and (force or time.monotonic() - self.painted_at >= self.interval):
+            self._paint()
+            flush()
+
+    # Repaint the whole pane, e.g. after a popup covered it
+    def touch(self):
+        self.win.touchwin()
+        self.dirty = True
+
+    def scroll(self, rows):
+        self.offset = max(0, self.offset + rows)
+        self.dirty = True
+        self.stage(force=True)
+
+    # Wait for a key, letting PageUp/PageDown scroll through the output meanwhile.
+    # With a timeout in milliseconds, returns -1 if no key arrived in time.
+    def getch(self, timeout=-1):
+        self.win.timeout(timeout)
+        while True:
+            if self.dirty:
+                self.stage(force=True)
+            else:
+                present(self.win)
+            key = self.win.getch()
+            page = max(self.win.getmaxyx()[0] - 1, 1)
+            if key == curses.KEY_PPAGE:
+                self.scroll(page)
+            elif key == curses.KEY_NPAGE:
+                self.scroll(-page)
+            else:
+                return key
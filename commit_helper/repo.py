@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Repository discovery without running git.
+#
+# Follows the same rules as git: GIT_DIR / GIT_WORK_TREE win, otherwise walk up
+# from the current directory looking for .git, which is either the repository
+# directory itself or a "gitdir: <path>" file (linked worktrees, submodules).
+# The walk stops at GIT_CEILING_DIRECTORIES and, unless
+# GIT_DISCOVERY_ACROSS_FILESYSTEM is set, at filesystem boundaries. The result
+# is cached, so every step of a session shares one lookup.
+
+import os
+
+
+class Repository:
+    __slots__ = ("worktree", "git_dir", "common_dir")
+
+    def __init__(self, worktree, git_dir, common_dir):
+        self.worktree = worktree  # Top of the working tree
+        self.git_dir = git_dir  # This worktree's .git directory
+        self.common_dir = common_dir  # Shared objects/refs (== git_dir outside linked worktrees)
+
+    def __repr__(self):
+        return "Repository(worktree=%r, git_dir=%r)" % (self.worktree, self.git_dir)
+
+
+# Does path look like a .git directory (what git's is_git_directory checks)
+def is_git_dir(path):
+    if not os.path.isfile(os.path.join(path, "HEAD")):
+        return False
+    common = _common_dir(path)
+    return os.path.isdir(os.path.join(common, "objects")) and os.path.isdir(os.path.join(common, "refs"))
+
+
+def _common_dir(git_dir):
+    try:
+        with open(os.path.join(git_dir, "commondir")) as f:
+            common = f.read().strip()
+    except OSError:
+        return git_dir
+    return os.path.normpath(os.path.join(git_dir, common))
+
+
+# Resolve a .git file ("gitdir: ../.git/worktrees/x") relative to its directory
+def _read_gitfile(path):
+    try:
+        with open(path) as f:
+            line = f.readline().strip()
+    except OSError:
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(path), line[len("gitdir:"):].strip()))
+
+
+def _ceilings(env):
+    return {os.path.realpath(p) for p in env.get("GIT_CEILING_DIRECTORIES", "").split(os.pathsep) if os.path.isabs(p)}
+
+
+def discover_repository(start=None, env=None):
+    env = os.environ if env is None else env
+    start = os.path.realpath(start or os.getcwd())
+
+    if env.get("GIT_DIR"):
+        git_dir = os.path.realpath(os.path.join(start, env["GIT_DIR"]))
+        if not is_git_dir(git_dir):
+            return None
+        worktree = os.path.realpath(os.path.join(start, env.get("GIT_WORK_TREE") or "."))
+        return Repository(worktree, git_dir, _common_dir(git_dir))
+
+    ceilings = _ceilings(env)
+    cross_filesystem = env.get("GIT_DISCOVERY_ACROSS_FILESYSTEM", "").lower() in ("1", "true", "yes", "on")
+    device = os.stat(start).st_dev
+    directory = start
+    while True:
+        dot_git = os.path.join(directory, ".git")
+        if os.path.isdir(dot_git):
+            git_dir = dot_git if is_git_dir(dot_git) else None
+        elif os.path.isfile(dot_git):
+            git_dir = _read_gitfile(dot_git)
+            git_dir = git_dir if git_dir and is_git_dir(git_dir) else None
+        else:
+            git_dir = None
+        if git_dir is not None:
+            worktree = os.path.realpath(env.get("GIT_WORK_TREE") or directory)
+            return Repository(worktree, git_dir, _common_dir(git_dir))
+        if is_git_dir(directory):
+            return None  # Inside a .git directory or a bare repository: no work tree
+
+        parent = os.path.dirname(directory)
+        if parent == directory or parent in ceilings:
+            return None
+        if not cross_filesystem and os.stat(parent).st_dev != device:
+            return None
+        directory = parent
+
+
+_DISCOVERED = {}
+
+
+# Repository of the current directory, discovered once per session
+def get_repository():
+    key = (os.getcwd(), os.environ.get("GIT_DIR"), os.environ.get("GIT_WORK_TREE"))
+    if key not in _DISCOVERED:
+        _DISCOVERED[key] = discover_repository()
+    return _DISCOVERED[key]
+
+
+# Check if the current directory is a git repository
+def is_git_repository():
+    return get_repository() is not None
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Rewrite existing commit messages the way the helper writes new ones.
+#
+#   python -m commit_helper.rewrite [--type TYPE] [--bodies] [--dry-run] [REF...]
+#
+# `git fast-export --no-data` is piped through a filter into
+# `git fast-import`. The filter copies the stream line by line and only
+# rewrites the payload of each commit's message, so memory stays bounded by
+# the largest single message whatever the length of the history, and no blob
+# is read since the rewritten commits point at the same trees.
+#
+# Titles get a commit type and title case: a title that starts with a type
+# ("📥 Add ...") or with a type's name ("fix the parser") keeps that type,
+# anything else gets --type. With --bodies the paragraphs of the body are
+# normalized too, except trailers such as "Signed-off-by:". The old tips are
+# kept under refs/commit-helper/original/ so a rewrite can be undone with
+# `git update-ref`. Tags are not moved.
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+from commit_helper.formatting import EMOJIS, find_commit_type, format_many, process_code_string, split_commit_type
+
+BACKUP_PREFIX = "refs/commit-helper/original/"
+DEFAULT_TYPE = "Update"
+PROGRESS_EVERY = 1000
+
+# Type names as they might start a plain title, longest first ("pass unit test" before "pass test")
+_LABELS = sorted(((entry.partition(" ")[2].lower(), entry) for entry in EMOJIS if " " in entry),
+                 key=lambda item: len(item[0]), reverse=True)
+_TRAILER = re.compile(r"^[A-Za-z][A-Za-z0-9-]*: ")
+# Trailers git itself adds; one of them makes a mostly-prose block count
+_GIT_TRAILERS = ("Signed-off-by: ", "(cherry picked from commit ")
+
+
+# Commit type and the rest of a title that does not carry an emoji yet
+def _guess_type(title, default_type):
+    lowered = title.lower()
+    for label, entry in _LABELS:
+        if lowered.startswith(label) and (len(lowered) == len(label) or lowered[len(label)] == " "):
+            return entry, title[len(label):]
+    return default_type, title
+
+
+def format_title(title, default_type):
+    entry, rest = split_commit_type(title)
+    if entry is None:
+        entry, rest = _guess_type(title, default_type)
+    rest = rest.strip()
+    return process_code_string(entry + " " + rest if rest else entry, capitalize_mode="all")
+
+
+def _is_trailer(line):
+    return bool(_TRAILER.match(line)) or line.startswith(_GIT_TRAILERS)
+
+
+# Split the last paragraph into prose and the trailer lines ending it, by the
+# rules of git interpret-trailers: the paragraph counts as a trailer block if
+# all of it is trailers (and their indented continuation lines), or if at
+# least a quarter of it is and one was added by git. ("", paragraph) when it
+# is all trailers, (paragraph, "") when it has none.
+def _split_trailers(paragraph):
+    lines = paragraph.splitlines()
+    trailers = sum(1 for line in lines if _is_trailer(line))
+    continued = [i > 0 and line[:1] in (" ", "\t") for i, line in enumerate(lines)]
+    if all(_is_trailer(line) or c for line, c in zip(lines, continued)):
+        return "", paragraph
+    if not any(line.startswith(_GIT_TRAILERS) for line in lines) or 4 * trailers < len(lines):
+        return paragraph, ""
+    start = len(lines)
+    while start > 0 and (_is_trailer(lines[start - 1]) or continued[start - 1]):
+        start -= 1
+    while start < len(lines) and not _is_trailer(lines[start]):
+        start += 1  # Continuation lines need the trailer they continue
+    return "\n".join(lines[:start]), "\n".join(lines[start:])
+
+
+def format_body(body):
+    paragraphs = re.split(r"\n[ \t]*\n", body.strip("\n"))
+    prose, trailers = _split_trailers(paragraphs[-1])
+    paragraphs[-1] = prose
+    todo = [p for p in paragraphs if p.strip() and not all(_TRAILER.match(line) for line in p.splitlines())]
+    formatted = dict(zip(todo, format_many(todo)))
+    paragraphs = [formatted.get(p, p) for p in paragraphs]
+    if trailers:
+        # Trailers stay as they were, right under the prose they ended
+        paragraphs[-1] = paragraphs[-1] + "\n" + trailers if paragraphs[-1] else trailers
+    return "\n\n".join(paragraphs)
+
+
+# New message for a commit message (bytes in, bytes out)
+def format_message(message, default_type, bodies=False):
+    text = message.decode("utf-8", "surrogateescape")
+    title, _, rest = text.partition("\n")
+    new = format_title(title, default_type)
+    if rest.strip():
+        if bodies:
+            rest = "\n" + format_body(rest) + "\n"
+        new += "\n" + rest
+    else:
+        new += "\n"
+    return new.encode("utf-8", "surrogateescape")
+
+
+class RewriteStats:
+    def __init__(self, total=None):
+        self.total = total
+        self.commits = 0
+        self.changed = 0
+        self.samples = []  # (old title, new title) of the first few changes
+        self.started = time.monotonic()
+
+    def report(self, stream, final=False):
+        rate = self.commits / max(time.monotonic() - self.started, 1e-9)
+        done = ("%d/%d" % (self.commits, self.total)) if self.total else str(self.commits)
+        stream.write("\rRewriting commits: %s, %d changed (%.0f/s)%s" % (done, self.changed, rate, "\n" if final else ""))
+        stream.flush()
+
+
+# Copy a fast-export stream from src to dst, rewriting commit messages
+def filter_stream(src, dst, rewrite, stats, progress=None):
+    in_commit = False
+    while True:
+        line = src.readline()
+        if not line:
+            break
+        if line.startswith(b"data "):
+            payload = src.read(int(line[5:]))
+            if in_commit:
+                # The first data after "commit" is the message; file changes follow
+                in_commit = False
+                new = rewrite(payload)
+                stats.commits += 1
+                if new != payload:
+                    stats.changed += 1
+                    if len(stats.samples) < 10:
+                        stats.samples.append((payload.partition(b"\n")[0], new.partition(b"\n")[0]))
+                    payload = new
+                if progress is not None and stats.commits % PROGRESS_EVERY == 0:
+                    progress(stats)
+            dst.write(b"data %d\n" % len(payload))
+            dst.write(payload)
+            continue
+        if line.startswith(b"commit "):
+            in_commit = True
+        elif line.startswith((b"tag ", b"reset ", b"blob")):
+            in_commit = False
+        dst.write(line)
+
+
+def _git(args, check=True):
+    return subprocess.run(["git"] + args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, text=True, check=check).stdout.strip()
+
+
+# Full names and current tips of the refs to rewrite (the current branch by default)
+def resolve_refs(refs):
+    if not refs:
+        refs = [_git(["symbolic-ref", "-q", "HEAD"])]
+    resolved = []
+    for ref in refs:
+        name = _git(["rev-parse", "--symbolic-full-name", ref])
+        if not name.startswith("refs/heads/"):
+            raise ValueError("Not a branch: " + ref)
+        resolved.append((name, _git(["rev-parse", name])))
+    return resolved
+
+
+def rewrite_history(refs, default_type, bodies=False, dry_run=False, stream=sys.stderr):
+    refs = resolve_refs(refs)
+    stats = RewriteStats(int(_git(["rev-list", "--count"] + [name for name, _ in refs])))
+    export = subprocess.Popen(["git", "fast-export", "--no-data", "--reencode=yes", "--signed-tags=strip",
+                               "--use-done-feature"] + [name for name, _ in refs],
+                              stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+    if dry_run:
+        sink = open("/dev/null", "wb")
+        importer = None
+    else:
+        for name, tip in refs:
+            _git(["update-ref", BACKUP_PREFIX + name[len("refs/"):], tip])
+        importer = subprocess.Popen(["git", "fast-import", "--quiet", "--force"], stdin=subprocess.PIPE)
+        sink = importer.stdin
+    try:
+        filter_stream(export.stdout, sink, lambda message: format_message(message, default_type, bodies), stats,
+                      lambda s: s.report(stream))
+    finally:
+        sink.close()
+        export.stdout.close()
+    ok = export.wait() == 0 and (importer is None or importer.wait() == 0)
+    stats.report(stream, final=True)
+    return ok, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite commit messages on branches the way the helper formats them.")
+    parser.add_argument("refs", nargs="*", help="branches to rewrite (default: the current branch)")
+    parser.add_argument("--type", default=DEFAULT_TYPE, help='commit type for titles without one (default: "%(default)s")')
+    parser.add_argument("--bodies", action="store_true", help="normalize message bodies too, not just titles")
+    parser.add_argument("--dry-run", action="store_true", help="show what would change without rewriting")
+    args = parser.parse_args(argv)
+    try:
+        default_type = find_commit_type(args.type)
+        ok, stats = rewrite_history(args.refs, default_type, args.bodies, args.dry_run)
+    except (ValueError, subprocess.CalledProcessError) as e:
+        print(getattr(e, "stderr", None) or str(e), file=sys.stderr)
+        return 1
+    for old, new in stats.samples:
+        print("%s\n  -> %s" % (old.decode("utf-8", "replace"), new.decode("utf-8", "replace")))
+    if not ok:
+        print("git fast-export/fast-import failed; the original tips are under " + BACKUP_PREFIX, file=sys.stderr)
+        return 1
+    if not args.dry_run and stats.changed:
+        print("Original tips saved under " + BACKUP_PREFIX)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# Working tree status from one `git status --porcelain=v2 -z` run.
+#
+# The staging picker shows these entries and stages the chosen ones with a
+# single `git add --pathspec-from-file=- --pathspec-file-nul`, so a commit
+# costs one status pass and one add however many files are picked. Paths are
+# relative to the top of the working tree; run both commands from there.
+#
+# prewarm_status() starts a refresh of the index and a status run on a thread
+# while the user is still typing. The refresh re-stats every tracked file and
+# rewrites the index, so neither the status read for the staging picker nor
+# the final git add has to rehash files whose contents did not change. The
+# picker still gets a fresh status from current_status(): files edited or
+# created while the title was typed leave the index alone, so the prefetched
+# entries cannot tell they are out of date. They only feed hints: the change
+# summary, the commit type guess and the first change markers.
+
+import os
+import subprocess
+import threading
+
+# Porcelain v2 record types
+CHANGED = "1"
+RENAMED = "2"
+UNMERGED = "u"
+UNTRACKED = "?"
+IGNORED = "!"
+
+# Space separated fields before the path, per record type
+_FIELDS = {CHANGED: 8, RENAMED: 9, UNMERGED: 10}
+
+
+class StatusEntry:
+    __slots__ = ("kind", "xy", "path", "orig_path")
+
+    def __init__(self, kind, xy, path, orig_path=None):
+        self.kind = kind
+        self.xy = xy  # Index and worktree status letters, "." for unchanged
+        self.path = path
+        self.orig_path = orig_path  # Source of a rename or copy
+
+    @property
+    def staged(self):
+        return self.kind in (CHANGED, RENAMED) and self.xy[0] != "."
+
+    @property
+    def unstaged(self):
+        return self.kind in (UNTRACKED, UNMERGED) or (self.kind in (CHANGED, RENAMED) and self.xy[1] != ".")
+
+    # Two letters as in `git status --short`
+    @property
+    def short(self):
+        if self.kind == UNTRACKED:
+            return "??"
+        if self.kind == IGNORED:
+            return "!!"
+        return self.xy.replace(".", " ")
+
+    def __repr__(self):
+        return "StatusEntry(%r, %r, %r)" % (self.kind, self.xy, self.path)
+
+
+def parse_status(data):
+    records = data.decode("utf-8", "surrogateescape").split("\0")
+    entries = []
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record or record[0] == "#":
+            continue
+        kind = record[0]
+        if kind in (UNTRACKED, IGNORED):
+            entries.append(StatusEntry(kind, "", record[2:]))
+            continue
+        fields = record.split(" ", _FIELDS.get(kind, 1))
+        if kind not in _FIELDS or len(fields) <= _FIELDS[kind]:
+            continue  # Unknown record type from a newer git
+        orig_path = None
+        if kind == RENAMED:
+            orig_path = records[i]  # The rename source is the next record
+            i += 1
+        entries.append(StatusEntry(kind, fields[1], fields[-1], orig_path))
+    return entries
+
+
+# Raw `git status --porcelain=v2 -z` output for worktree. Background runs
+# pass optional_locks=False: git then does not write refreshed stat data back
+# to the index, so it never holds index.lock while the user runs git in
+# another terminal.
+def status_bytes(worktree, optional_locks=True):
+    command = ["git"] + ([] if optional_locks else ["--no-optional-locks"]) + ["status", "--porcelain=v2", "-z"]
+    return subprocess.run(command, cwd=worktree, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, check=True).stdout
+
+
+# Changed, untracked and conflicted files under worktree
+def read_status(worktree, optional_locks=True):
+    return parse_status(status_bytes(worktree, optional_locks))
+
+
+# Refresh the index stat data, so status and add need not rehash unchanged files
+def refresh_index(worktree):
+    # Fails harmlessly if someone else holds index.lock
+    subprocess.run(["git", "update-index", "-q", "--refresh"], cwd=worktree,
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _pathspec_command(command, paths, worktree):
+    # Literal pathspecs: a file called "*.py" means that file, not a glob
+    env = dict(os.environ, GIT_LITERAL_PATHSPECS="1")
+    data = b"".join(os.fsencode(path) + b"\0" for path in paths)
+    return subprocess.run(command + ["--pathspec-from-file=-", "--pathspec-file-nul"], cwd=worktree, env=env,
+                          input=data, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+# Stage paths (including deletions) in one git add; returns the CompletedProcess
+def stage_paths(paths, worktree):
+    return _pathspec_command(["git", "add", "--all"], paths, worktree)
+
+
+# Drop already staged changes to paths from the index, keeping the files
+def unstage_paths(paths, worktree):
+    return _pathspec_command(["git", "reset", "-q"], paths, worktree)
+
+
+def index_key(git_dir):
+    path = os.environ.get("GIT_INDEX_FILE") or os.path.join(git_dir, "index")
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class StatusPrefetch:
+    def __init__(self, repo, fetch=None):
+        self.repo = repo
+        self.fetch = fetch  # Returns (entries, index key) from elsewhere, or None
+        self.entries = None
+        self.error = None
+        self.index_key = None
+        self._thread = threading.Thread(target=self._run, name="status-prefetch", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        worktree = self.repo.worktree
+        fetched = None
+        if self.fetch is not None:
+            try:
+                fetched = self.fetch()
+            except (OSError, ValueError):
+                pass  # Compute it here instead
+        if fetched is not None:
+            self.entries, self.index_key = fetched
+        else:
+            try:
+                refresh_index(worktree)
+                self.entries = read_status(worktree)
+            except (OSError, subprocess.CalledProcessError) as e:
+                self.error = e
+            self.index_key = index_key(self.repo.git_dir)  # The index the entries were read against
+
+    def wait(self):
+        self._thread.join()
+
+
+_PREFETCHES = {}
+
+
+# Start refreshing the index and reading the status of repo in the background,
+# or fetching it with fetch() (see commit_helper/daemon.py)
+def prewarm_status(repo, fetch=None):
+    if repo is not None and repo.worktree not in _PREFETCHES:
+        _PREFETCHES[repo.worktree] = StatusPrefetch(repo, fetch)
+
+
+# The prefetched entries without using them up, waiting for the prefetch to
+# finish; None if there is none or it failed
+def peek_status(repo):
+    prefetch = _PREFETCHES.get(repo.worktree)
+    if prefetch is None:
+        return None
+    prefetch.wait()
+    return prefetch.entries
+
+
+# Status of repo as it is now, once the prefetch has refreshed the index so
+# the status run only rehashes what really changed
+def current_status(repo):
+    prefetch = _PREFETCHES.pop(repo.worktree, None)
+    if prefetch is not None:
+        prefetch.wait()
+    return read_status(repo.worktree)
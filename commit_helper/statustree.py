@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Changed-file markers for the file picker.
+#
+# One `git status --porcelain=v2 -z` is folded into a tree of path
+# components. Every directory node counts, per status letter, the changes
+# anywhere beneath it, so marking a listing is one walk down to its directory
+# and then one dict lookup per entry, with no further git call:
+#
+#   M  modified          A  added (or the new side of a rename)
+#   D  deleted           ?  untracked        U  unmerged
+#
+# A directory shows the letter its changes have in common, "*" when they
+# differ. An untracked directory is reported by git as a single "dir/" entry
+# and marks everything below it.
+#
+# ChangeMarks keeps the tree for a working tree and rebuilds it on a thread
+# when it may be out of date: the index changed, a listing the picker showed
+# was rescanned, or the directory watcher saw a file written or an entry come
+# or go. The watcher only covers the whole working tree once the path list of
+# commit_helper/pathindex.py has a watch on every directory; until then, or
+# without inotify, the tree is also rebuilt when older than MAX_AGE. Until the
+# new tree is in the old one keeps being shown; `version` tells the picker when
+# to repaint. These runs pass --no-optional-locks, so the markers never take
+# index.lock from under the user's own git commands.
+
+import os
+import subprocess
+import threading
+import time
+
+from commit_helper.pathindex import peek_repo_paths, seed_repo_paths
+from commit_helper.status import IGNORED, RENAMED, UNMERGED, UNTRACKED, index_key, peek_status, read_status
+from commit_helper.watch import get_watcher, in_worktree
+
+MAX_AGE = 5.0  # Seconds before the tree is refreshed while the picker is open, unless fully watched
+MIXED = "*"
+
+
+class _Node:
+    __slots__ = ("children", "counts", "mark")
+
+    def __init__(self):
+        self.children = {}
+        self.counts = {}  # Letter -> changes beneath, directories only
+        self.mark = None  # Letter of the change to this very path
+
+
+def _letter(entry):
+    if entry.kind == UNTRACKED:
+        return "?"
+    if entry.kind == UNMERGED:
+        return "U"
+    letter = entry.xy[1] if entry.xy[1] != "." else entry.xy[0]
+    return "A" if letter in ("R", "C") else letter
+
+
+class StatusTree:
+    def __init__(self, entries=()):
+        self.root = _Node()
+        for entry in entries:
+            if entry.kind == IGNORED:
+                continue
+            self._add(entry.path, _letter(entry))
+            if entry.kind == RENAMED and entry.orig_path and entry.xy[0] == "R":
+                self._add(entry.orig_path, "D")
+
+    def _add(self, path, letter):
+        node = self.root
+        for part in path.rstrip("/").split("/"):
+            node.counts[letter] = node.counts.get(letter, 0) + 1
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+            node = child
+        node.mark = letter
+
+    @staticmethod
+    def _node_mark(node):
+        if node.mark is not None:
+            return node.mark
+        if not node.counts:
+            return ""
+        if len(node.counts) == 1:
+            return next(iter(node.counts))
+        return MIXED
+
+    # Markers ("" for unchanged) for names in the directory at relative path
+    # ("" for the top of the working tree)
+    def annotate(self, directory, names):
+        node = self.root
+        for part in directory.split("/") if directory else ():
+            if node.mark == "?":
+                return ["?"] * len(names)  # Inside an untracked directory
+            node = node.children.get(part)
+            if node is None:
+                return [""] * len(names)
+        if node.mark == "?":
+            return ["?"] * len(names)
+        children = node.children
+        marks = []
+        for name in names:
+            child = children.get(name)
+            marks.append(self._node_mark(child) if child is not None else "")
+        return marks
+
+
+class ChangeMarks:
+    def __init__(self, repo):
+        self.repo = repo
+        self.tree = None  # StatusTree, None until the first status is in
+        self.version = 0  # Bumped with every new tree
+        self._built_at = None
+        self._index_key = None
+        self._stale = False
+        self._listing_keys = {}  # Directory -> key of the listing last marked
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self, first):
+        try:
+            entries = peek_status(self.repo) if first else None
+            if entries is None:
+                entries = read_status(self.repo.worktree, optional_locks=False)
+            self.tree = StatusTree(entries)
+            self.version += 1
+        except (OSError, subprocess.CalledProcessError):
+            pass  # Keep showing the old markers
+        self._built_at = time.monotonic()
+
+    def _build(self, key):
+        self._index_key = key
+        self._stale = False
+        self._thread = threading.Thread(target=self._run, args=(self.tree is None,), name="status-tree", daemon=True)
+        self._thread.start()
+
+    # Something in the working tree changed: rebuild on the next refresh()
+    def invalidate(self):
+        self._stale = True
+
+    # Watcher event anywhere; only the working tree outside .git matters
+    def _changed(self, kind, directory, name, is_dir):
+        if in_worktree(self.repo.worktree, directory, name):
+            self.invalidate()
+
+    # Do watcher events reach us for every directory of the working tree?
+    def _fully_watched(self):
+        repo_paths = peek_repo_paths(self.repo.worktree)
+        return repo_paths is not None and repo_paths.fully_watched()
+
+    # Start a rebuild in the background if the tree may be out of date
+    def refresh(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            key = index_key(self.repo.git_dir)
+            if (self._thread is None or self._stale or key != self._index_key
+                    or (time.monotonic() - self._built_at > MAX_AGE and not self._fully_watched())):
+                self._build(key)
+
+    # Markers for the entries of listing, all "" until the first tree is in
+    def annotate(self, listing):
+        if self._listing_keys.setdefault(listing.path, listing.key) != listing.key:
+            self._listing_keys[listing.path] = listing.key
+            self.invalidate()  # Entries came or went since the tree was built
+        tree = self.tree
+        if tree is None:
+            return [""] * len(listing)
+        relative = os.path.relpath(os.path.realpath(listing.path), self.repo.worktree)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return [""] * len(listing)
+        return tree.annotate("" if relative == os.curdir else relative.replace(os.sep, "/"), listing.entries)
+
+
+_MARKS = {}
+
+
+def get_change_marks(repo):
+    marks = _MARKS.get(repo.worktree)
+    if marks is None:
+        marks = _MARKS[repo.worktree] = ChangeMarks(repo)
+        watcher = get_watcher()
+        if watcher is not None:
+            watcher.subscribe(marks._changed)
+            if not watcher.full:
+                # Its watches are what lets the markers do without the timer
+                threading.Thread(target=seed_repo_paths, args=(repo.worktree, None), name="repo-paths",
+                                 daemon=True).start()
+    return marks
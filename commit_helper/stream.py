@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Run a command and hand its output over line by line as it arrives.
+#
+# stdout and stderr are read with a selector in fixed-size chunks, so a chatty
+# hook or a push of a large pack never sits in memory as a whole. Lines ending
+# in "\r" (git's progress meters redraw themselves that way) are reported with
+# overwrite=True. Scrollback keeps the last lines in a ring buffer.
+
+import codecs
+import os
+import re
+import selectors
+import subprocess
+from collections import deque
+
+CHUNK_SIZE = 65536
+# Longer lines are passed on in pieces
+MAX_LINE = 16384
+
+# "Writing objects:  40% (4/10), 1.20 MiB | 600.00 KiB/s", optionally prefixed "remote: "
+PROGRESS_RE = re.compile(r"^(?:remote: )?(?P<phase>[A-Za-z][A-Za-z ]*):\s+(?P<percent>\d+)% \((?P<done>\d+)/(?P<total>\d+)\)(?P<rest>.*)$")
+
+
+class Progress:
+    __slots__ = ("phase", "percent", "done", "total", "rest")
+
+    def __init__(self, phase, percent, done, total, rest):
+        self.phase = phase
+        self.percent = percent
+        self.done = done
+        self.total = total
+        self.rest = rest
+
+    # "Writing objects [########............]  40% (4/10), 1.20 MiB | 600.00 KiB/s"
+    def bar(self, width):
+        rest = self.rest[: -len(", done.")] if self.rest.endswith(", done.") else self.rest
+        label = "%s %3d%% (%d/%d)%s" % (self.phase, self.percent, self.done, self.total, rest.rstrip())
+        cells = max(10, min(40, width - len(label) - 4))
+        filled = cells * min(self.percent, 100) // 100
+        return ("[" + "#" * filled + "." * (cells - filled) + "] " + label)[: max(width, 0)]
+
+
+def parse_progress(line):
+    match = PROGRESS_RE.match(line.strip())
+    if match is None:
+        return None
+    return Progress(match.group("phase"), int(match.group("percent")), int(match.group("done")),
+                    int(match.group("total")), match.group("rest"))
+
+
+# Run command, calling on_line(stream_name, line, overwrite) for each line of
+# output as it arrives. on_start(process) gets the Popen, e.g. to kill it from
+# another thread. on_idle() is called after every read and at least every
+# idle_every seconds while the command is quiet, e.g. to show output held
+# back by a frame rate limit. Returns the exit status.
+def stream_command(command, on_line, cwd=None, env=None, on_start=None, start_new_session=False,
+                   on_idle=None, idle_every=0.05):
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               start_new_session=start_new_session)
+    if on_start is not None:
+        on_start(process)
+    selector = selectors.DefaultSelector()
+    pending = {}
+    for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+        selector.register(pipe, selectors.EVENT_READ, name)
+        pending[name] = ["", codecs.getincrementaldecoder("utf-8")("replace")]
+
+    try:
+        while selector.get_map():
+            for key, _ in selector.select(None if on_idle is None else idle_every):
+                name = key.data
+                data = os.read(key.fileobj.fileno(), CHUNK_SIZE)
+                buffered, decoder = pending[name]
+                if not data:
+                    selector.unregister(key.fileobj)
+                    buffered += decoder.decode(b"", final=True)
+                    if buffered:
+                        on_line(name, buffered, False)
+                    pending[name][0] = ""
+                    continue
+                pending[name][0] = _split_lines(name, buffered + decoder.decode(data), on_line)
+            if on_idle is not None:
+                on_idle()
+    finally:
+        selector.close()
+        process.stdout.close()
+        process.stderr.close()
+    return process.wait()
+
+
+# Emit every complete line in text and return the unterminated rest
+def _split_lines(name, text, on_line):
+    held = ""
+    if text.endswith("\r"):
+        text, held = text[:-1], "\r"  # Might be the first half of "\r\n"
+    start = 0
+    for match in re.finditer(r"\r\n|\n|\r", text):
+        on_line(name, text[start : match.start()], match.group() == "\r")
+        start = match.end()
+    rest = text[start:]
+    while len(rest) > MAX_LINE:
+        on_line(name, rest[:MAX_LINE], False)
+        rest = rest[MAX_LINE:]
+    return rest + held
+
+
+# The last lines of output, each a list of (text, attr) segments
+class Scrollback:
+    def __init__(self, capacity=2000):
+        self.lines = deque([[]], maxlen=capacity)
+        self.dropped = 0  # Lines that fell off the top
+
+    def __len__(self):
+        return len(self.lines)
+
+    def newline(self):
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append([])
+
+    # Append text at the end of the last line, starting new lines at "\n"
+    def write(self, text, attr=0):
+        for i, part in enumerate(text.split("\n")):
+            if i:
+                self.newline()
+            if part:
+                self.lines[-1].append((part, attr))
+
+    def replace_last(self, text, attr=0):
+        self.lines[-1] = [(text, attr)] if text else []
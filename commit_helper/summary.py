@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Change summary for the side panel next to the prompts.
+#
+# A ChangeScan runs on a thread: file counts come from the status that
+# commit_helper.status already prefetches, line counts from
+# `git diff --numstat -z`, once for the index and once for the working tree.
+# The numstat output is parsed as it streams in and every record bumps
+# `version`, so the UI can repaint as results arrive without waiting for the
+# whole diff. A diff with more than max_files files, or one that takes longer
+# than max_seconds, is cut short and the totals are marked as capped.
+
+import os
+import subprocess
+import threading
+import time
+
+from commit_helper.status import CHANGED, RENAMED, UNMERGED, UNTRACKED, peek_status, read_status
+
+MAX_FILES = 2000
+MAX_SECONDS = 5.0
+CHUNK = 64 * 1024
+
+
+class DiffStat:
+    __slots__ = ("files", "insertions", "deletions", "binary")
+
+    def __init__(self):
+        self.files = 0
+        self.insertions = 0
+        self.deletions = 0
+        self.binary = 0
+
+
+class ChangeScan:
+    def __init__(self, repo, max_files=MAX_FILES, max_seconds=MAX_SECONDS):
+        self.repo = repo
+        self.max_files = max_files
+        self.max_seconds = max_seconds
+        self.staged = None  # File counts, None until the status is in
+        self.unstaged = None
+        self.untracked = None
+        self.conflicted = None
+        self.staged_lines = DiffStat()
+        self.unstaged_lines = DiffStat()
+        self.capped = False
+        self.done = False
+        self.version = 0  # Bumped whenever anything above changes
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="change-scan", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop = True
+
+    def _run(self):
+        try:
+            self._count_files()
+            deadline = time.monotonic() + self.max_seconds
+            for cached, stat in ((True, self.staged_lines), (False, self.unstaged_lines)):
+                if self._stop or not self._numstat(cached, stat, deadline):
+                    break
+        except (OSError, subprocess.CalledProcessError):
+            pass  # The panel just stays incomplete
+        self.done = True
+        self.version += 1
+
+    def _count_files(self):
+        entries = peek_status(self.repo)
+        if entries is None:
+            entries = read_status(self.repo.worktree)
+        tracked = [e for e in entries if e.kind in (CHANGED, RENAMED)]
+        self.staged = sum(1 for e in tracked if e.staged)
+        self.unstaged = sum(1 for e in tracked if e.xy[1] != ".")
+        self.untracked = sum(1 for e in entries if e.kind == UNTRACKED)
+        self.conflicted = sum(1 for e in entries if e.kind == UNMERGED)
+        self.version += 1
+
+    # Stream one numstat run into stat; False if it had to be cut short
+    def _numstat(self, cached, stat, deadline):
+        command = ["git", "diff", "--numstat", "-z", "--no-ext-diff"] + (["--cached"] if cached else [])
+        process = subprocess.Popen(command, cwd=self.repo.worktree, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        rest = b""
+        skip = 0  # Path records still to come for a rename
+        budget = self.max_files - self.staged_lines.files - self.unstaged_lines.files
+        try:
+            while budget >= 0 and not self._stop and time.monotonic() < deadline:
+                chunk = os.read(process.stdout.fileno(), CHUNK)
+                if not chunk:
+                    return True
+                records = (rest + chunk).split(b"\0")
+                rest = records.pop()
+                for record in records:
+                    if skip:
+                        skip -= 1
+                        continue
+                    budget -= 1
+                    if budget < 0:
+                        break
+                    added, _, tail = record.partition(b"\t")
+                    deleted, _, path = tail.partition(b"\t")
+                    if not path:
+                        skip = 2  # "added\tdeleted\t\0old\0new\0"
+                    if added == b"-":
+                        stat.binary += 1
+                    elif added.isdigit() and deleted.isdigit():
+                        stat.insertions += int(added)
+                        stat.deletions += int(deleted)
+                    stat.files += 1
+                self.version += 1
+            self.capped = not self._stop
+            return False
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
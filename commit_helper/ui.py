@@ -0,0 +1,768 @@
+# -*- coding: utf-8 -*-
+# Curses front end: commit type menu, prompts, path pickers and git output.
+
+import curses
+import os
+import subprocess
+
+from commit_helper.classify import CommitTypeGuess
+from commit_helper.completion import common_prefix, get_completer
+from commit_helper.daemon import connect as connect_daemon
+from commit_helper.editor import TEXT, GapBuffer, KeyReader, LineView, set_bracketed_paste
+from commit_helper.formatting import EMOJIS, process_code_string
+from commit_helper.history import TitleHistory
+from commit_helper.ignore import visible_listing
+from commit_helper.listing import PREFETCHER, list_directory, prefetch_near
+from commit_helper.pathindex import get_path_index, prewarm_path_index
+from commit_helper.push import CANCELLED, FAILED, PUSH_COMMAND, BackgroundPush
+from commit_helper.pushqueue import enqueue
+from commit_helper.render import OutputPane, Popup, SidePanel, flush, present, read_key, restore_screen
+from commit_helper.repo import get_repository, is_git_repository
+from commit_helper.status import IGNORED, RENAMED, current_status, prewarm_status, stage_paths, unstage_paths
+from commit_helper.statustree import get_change_marks
+from commit_helper.stream import parse_progress, stream_command
+from commit_helper.summary import ChangeScan
+from commit_helper.viewport import Viewport
+
+
+# Listing for the file picker, without what git ignores
+def picker_listing(path):
+    repo = get_repository()
+    return visible_listing(list_directory(path), repo.worktree if repo is not None else None)
+
+# Picker rows: a change marker (see commit_helper/statustree.py), then the name
+def picker_rows(listing, marks):
+    if marks is None:
+        return listing.entries
+    return [(mark or " ") + " " + name for mark, name in zip(marks.annotate(listing), listing.entries)]
+
+MARKS_POLL_MS = 500  # How often an open picker looks for fresher markers
+
+#helper functions
+def handle_key_press(key, current_selection, entries, depth):
+   if key == curses.KEY_UP and current_selection > 0:
+       return current_selection - 1
+   elif key == curses.KEY_DOWN and current_selection < len(entries) - 1:
+       return current_selection + 1
+   elif key == curses.KEY_PPAGE:
+       return "page_up"
+   elif key == curses.KEY_NPAGE:
+       return "page_down"
+   elif key == curses.KEY_HOME:
+       return "home"
+   elif key == curses.KEY_END:
+       return "end"
+   elif key == curses.KEY_RIGHT:
+       return "dive"
+   elif key == curses.KEY_LEFT and depth > 0:
+       return "go_back"
+   elif key in [10, 13]: # Enter key
+       return "select"
+   elif key == 27: # Escape key
+       return "exit"
+   elif key == curses.KEY_RESIZE:
+       return "resize"
+
+# Draw one menu entry, truncated to the window width
+def draw_menu_row(win, view, idx, entry, selected, row_offset=0, clear=False):
+   height, width = win.getmaxyx()
+   row = row_offset + view.row_of(idx)
+   if row >= height:
+       return
+   win.attron(selected if idx == view.selection else curses.color_pair(6))
+   # Stay off the last column: writing the bottom-right cell raises curses.error
+   win.addnstr(row, 0, entry, max(width - 1, 0))
+   win.attroff(selected)
+   win.attroff(curses.color_pair(6))
+   if clear:
+       win.clrtoeol()
+
+# Recursive function to show the file selection menu
+def show_menu(stdscr, y, x, base_path, current_path, depth=0):
+   listing = picker_listing(current_path)
+   entries = listing.entries
+   repo = get_repository()
+   marks = get_change_marks(repo) if repo is not None else None
+   marks_version = None
+   rows = entries
+   prefetched = None
+   popup = Popup(stdscr, y, x + (depth * 25), max(len(entries), 1))
+   popup.win.timeout(MARKS_POLL_MS)
+   view = Viewport(len(entries), popup.height)
+
+   color_pair_selected = curses.color_pair(4) | curses.A_BOLD # Bold text for selected item
+
+   dirty = None  # None: repaint the visible slice, else only these entries
+   try:
+       while True:
+           if marks is not None:
+               marks.refresh()
+               if marks.version != marks_version:
+                   marks_version = marks.version
+                   rows = picker_rows(listing, marks)
+                   dirty = None
+           if view.selection != prefetched:
+               # Read the highlighted directory and its neighbours while the user decides
+               prefetched = view.selection
+               prefetch_near(listing, prefetched)
+           if dirty is None:
+               for idx in view.visible_range():
+                   draw_menu_row(popup.win, view, idx, rows[idx], color_pair_selected, clear=True)
+           else:
+               for idx in dirty:
+                   draw_menu_row(popup.win, view, idx, rows[idx], color_pair_selected)
+           key = read_key(popup.win)
+
+           current_selection = view.selection
+           action = handle_key_press(key, current_selection, entries, depth)
+           dirty = []
+           if action == current_selection - 1:
+               dirty = view.move(-1)
+           elif action == current_selection + 1:
+               dirty = view.move(1)
+           elif action == "page_up":
+               dirty = view.page(-1)
+           elif action == "page_down":
+               dirty = view.page(1)
+           elif action == "home":
+               dirty = view.home()
+           elif action == "end":
+               dirty = view.end()
+           elif action == "resize":
+               popup.fit()
+               view.resize(popup.height)
+               dirty = None
+           elif action == "dive":
+               if listing.is_dir(current_selection):
+                   new_path = os.path.join(current_path, entries[current_selection])
+                   selected = show_menu(stdscr, y, x, base_path, new_path, depth + 1)
+                   if selected:
+                      return selected
+           elif action == "go_back":
+               return None
+           elif action == "select":
+               if entries:
+                   return os.path.relpath(os.path.join(current_path, entries[current_selection]), base_path)
+           elif action == "exit":
+               return None
+   finally:
+       PREFETCHER.cancel()
+       popup.close()
+
+
+# Fuzzy search popup over every path in the repository
+def fuzzy_finder(stdscr, y, index):
+    color_pair_selected = curses.color_pair(4) | curses.A_BOLD
+    popup = Popup(stdscr, y, 0)
+    win = popup.win
+    view = Viewport(0, popup.height - 1)
+    query = ""
+    results = index.search(query, view.height)
+    dirty = None
+
+    while True:
+        if dirty is None:
+            view = Viewport(len(results), popup.height - 1)
+            win.erase()
+            for idx in view.visible_range():
+                draw_menu_row(win, view, idx, results[idx], color_pair_selected, row_offset=1)
+            win.attron(curses.color_pair(5))
+            win.addnstr(0, 0, "Find: ", popup.width - 1)
+            win.attroff(curses.color_pair(5))
+            win.addnstr(query, max(popup.width - 7, 0))
+        else:
+            for idx in dirty:
+                draw_menu_row(win, view, idx, results[idx], color_pair_selected, row_offset=1)
+        win.move(0, min(6 + len(query), popup.width - 1))
+
+        key = read_key(win)
+        dirty = []
+        if key == curses.KEY_UP:
+            dirty = view.move(-1)
+        elif key == curses.KEY_DOWN:
+            dirty = view.move(1)
+        elif key in [10, 13]:  # Enter key
+            if results:
+                break
+        elif key == 27:  # Escape key
+            results = []
+            break
+        elif key == curses.KEY_RESIZE:
+            popup.fit()
+            results = index.search(query, popup.height - 1)
+            dirty = None
+        elif key in [curses.KEY_BACKSPACE, 127, 8]:
+            query = query[:-1]
+            results = index.search(query, view.height)
+            dirty = None
+        elif 32 <= key <= 126:
+            query += chr(key)
+            results = index.search(query, view.height)
+            dirty = None
+
+    popup.close()
+    return results[view.selection] if results else None
+
+
+# Insert the selected path into the input string
+def insert_selected_path(input_str, selected_path, cursor_x, prompt_length):
+    return (input_str[: cursor_x - prompt_length] + "`" + selected_path + "`" + " " + input_str[cursor_x - prompt_length :]), cursor_x + len(selected_path) + 3
+
+
+# Complete the backticked path left of the cursor. Repeated Tabs cycle through
+# the candidates, carried between key presses in cycle (start, candidates, index)
+def complete_backticked_path(input_str, cursor_x, prompt_length, completer, cycle=None, step=1):
+    pos = cursor_x - prompt_length
+    if cycle is None:
+        head = input_str[:pos]
+        if head.count("`") % 2 == 0:  # Cursor is not inside backticks
+            return input_str, cursor_x, None
+        start = head.rfind("`") + 1
+        token = head[start:]
+        candidates = completer.complete(token) if not any(ch.isspace() for ch in token) else []
+        if not candidates:
+            return input_str, cursor_x, None
+        prefix = common_prefix(candidates)
+        if len(candidates) > 1 and len(prefix) > len(token):
+            # Extend to the shared prefix first, the next Tab starts cycling
+            return input_str[:start] + prefix + input_str[pos:], prompt_length + start + len(prefix), None
+        cycle = (start, candidates, -1 if step > 0 else 0)
+
+    start, candidates, index = cycle
+    index = (index + step) % len(candidates)
+    replacement = candidates[index]
+    if len(candidates) == 1:
+        cycle = None
+        if not replacement.endswith("/"):
+            replacement += "`"
+    else:
+        cycle = (start, candidates, index)
+    return input_str[:start] + replacement + input_str[pos:], prompt_length + start + len(replacement), cycle
+
+
+# Menu to prompt the user to select an commit type with emojis
+# suggest: optional object whose index() gives the item to preselect once it
+# is known (None until then); it is only applied while the user has not moved
+def custom_menu(stdscr, menu_title, menu_items, y=1, suggest=None):
+    curses.curs_set(0)  # Hide cursor
+    color_pair_selected = curses.color_pair(4) | curses.A_BOLD
+    popup = Popup(stdscr, y, 0, len(menu_items) + 1)  # +1 to account for the title line
+    view = Viewport(len(menu_items), popup.height - 1)
+
+    dirty = None
+    while True:
+        if suggest is not None and suggest.done:
+            if suggest.index() is not None:
+                moved = view.select(suggest.index())
+                dirty = None if dirty is None or moved is None else dirty + moved
+            suggest = None
+        # Poll for the suggestion while waiting for a key
+        popup.win.timeout(50 if suggest is not None else -1)
+        if dirty is None:
+            # Display menu title on the first line of the popup
+            popup.win.attron(curses.color_pair(5))
+            popup.win.addnstr(0, 0, menu_title, popup.width - 1)
+            popup.win.attroff(curses.color_pair(5))
+            for idx in view.visible_range():
+                draw_menu_row(popup.win, view, idx, menu_items[idx], color_pair_selected, row_offset=1, clear=True)
+        else:
+            for idx in dirty:
+                draw_menu_row(popup.win, view, idx, menu_items[idx], color_pair_selected, row_offset=1)
+
+        key = read_key(popup.win)
+        dirty = []
+        if key == -1:
+            continue  # Only the suggestion timeout
+        suggest = None  # The user's choice wins
+        if key == curses.KEY_UP:
+            dirty = view.move(-1)
+        elif key == curses.KEY_DOWN:
+            dirty = view.move(1)
+        elif key == curses.KEY_RESIZE:
+            popup.fit()
+            view.resize(popup.height - 1)
+            dirty = None
+        elif key in [curses.KEY_ENTER, ord("\n")]:
+            break  # User made a selection
+
+    popup.close()
+    return menu_items[view.selection]
+
+
+# Changed files with checkboxes: Space toggles the highlighted file, "a" all of
+# them. Returns the list of chosen flags on Enter, or None on Esc.
+def staging_picker(stdscr, y, entries):
+    curses.curs_set(0)
+    color_pair_selected = curses.color_pair(4) | curses.A_BOLD
+    title = "Files to commit (Space toggle, a all, Enter commit, Esc cancel):"
+    chosen = [True] * len(entries)
+    labels = []
+    for entry in entries:
+        path = entry.path if entry.orig_path is None else entry.orig_path + " -> " + entry.path
+        labels.append(entry.short + " " + path)
+    popup = Popup(stdscr, y, 0, len(entries) + 1)
+    view = Viewport(len(entries), popup.height - 1)
+
+    def row(idx):
+        return ("[x] " if chosen[idx] else "[ ] ") + labels[idx]
+
+    dirty = None
+    try:
+        while True:
+            if dirty is None:
+                popup.win.attron(curses.color_pair(5))
+                popup.win.addnstr(0, 0, title, popup.width - 1)
+                popup.win.attroff(curses.color_pair(5))
+                popup.win.clrtoeol()
+                for idx in view.visible_range():
+                    draw_menu_row(popup.win, view, idx, row(idx), color_pair_selected, row_offset=1, clear=True)
+            else:
+                for idx in dirty:
+                    draw_menu_row(popup.win, view, idx, row(idx), color_pair_selected, row_offset=1, clear=True)
+
+            key = read_key(popup.win)
+            dirty = []
+            if key == curses.KEY_UP:
+                dirty = view.move(-1)
+            elif key == curses.KEY_DOWN:
+                dirty = view.move(1)
+            elif key in (curses.KEY_PPAGE, curses.KEY_NPAGE):
+                dirty = view.page(-1 if key == curses.KEY_PPAGE else 1)
+            elif key == ord(" ") and entries:
+                chosen[view.selection] = not chosen[view.selection]
+                dirty = [view.selection]
+            elif key == ord("a"):
+                everything = not all(chosen)
+                chosen = [everything] * len(entries)
+                dirty = None
+            elif key == curses.KEY_RESIZE:
+                popup.fit()
+                view.resize(popup.height - 1)
+                dirty = None
+            elif key in [curses.KEY_ENTER, ord("\n")]:
+                return chosen
+            elif key == 27:
+                return None
+    finally:
+        popup.close()
+
+
+# Stage exactly the chosen files, from one status run: one git add for the
+# chosen files with unstaged changes, and one git reset for staged files that
+# were unticked. Chosen files already staged as they are stay out of the add:
+# a staged deletion is in neither the index nor the working tree, and git add
+# would reject its path. An unticked rename is reset on both sides, or the
+# deletion of the old path would stay staged.
+def stage_chosen(output, worktree, entries, chosen):
+    unticked = [e for e, c in zip(entries, chosen) if not c and e.staged]
+    for command, paths in ((stage_paths, [e.path for e, c in zip(entries, chosen) if c and e.unstaged]),
+                           (unstage_paths, [e.path for e in unticked]
+                            + [e.orig_path for e in unticked if e.kind == RENAMED and e.orig_path])):
+        if not paths:
+            continue
+        result = command(paths, worktree)
+        if result.stdout:
+            output.write("\n" + result.stdout.decode("utf-8", "replace").rstrip("\n"))
+        if result.returncode != 0:
+            output.write("\n\nGit command failed: staging exited with status " + str(result.returncode), curses.color_pair(3))
+            return False
+    return True
+
+
+# Paths are picked and inserted relative to the top of the working tree
+def picker_root():
+    repo = get_repository()
+    return repo.worktree if repo is not None else os.getcwd()
+
+
+# Return unread events to curses, so the next getch() sees them
+def push_back_keys(stdscr, events):
+    keys = []
+    for kind, key in events:
+        if kind == TEXT:
+            keys.extend(key.encode("utf-8"))
+        else:
+            keys.append(key)
+    try:
+        for key in reversed(keys):
+            curses.ungetch(key)
+    except curses.error:
+        pass  # The curses push-back queue is small; drop what does not fit
+
+
+# Get input from the user
+# titles: optional TitleHistory; previous titles that continue what was typed
+# after the commit type show up dimmed, and Right at the end accepts them
+def get_input(stdscr, y, prompt, color_pair, emoji=False, reader=None, suggest=None, titles=None):
+    if reader is None:
+        reader = KeyReader(stdscr, present)
+    buffer = GapBuffer()
+    view = LineView(stdscr, y, prompt, color_pair, 1 if emoji else 0)
+    view.ghost_attr = curses.color_pair(6) | curses.A_DIM
+    view.draw(buffer)
+
+    type_prefix = None
+    if emoji:
+        commit_type = custom_menu(stdscr, "Select Commit Type: ", EMOJIS, suggest=suggest)
+        type_prefix = commit_type + " "
+        buffer.insert(type_prefix)
+        view.mark(0)
+
+    def ghost():
+        if titles is None or completion is not None or buffer.cursor != len(buffer):
+            return ""
+        text = buffer.text()
+        if type_prefix is None or not text.startswith(type_prefix):
+            return ""
+        return titles.ghost(text[len(type_prefix):])
+    # Show the cursor
+    curses.curs_set(1)
+    cursor_line = view.draw(buffer)
+    completion = None
+    done = False
+    while not done:
+        # Handle every key already typed or pasted, then repaint once
+        events = reader.read_events()
+        for index, (kind, key) in enumerate(events):
+            edit = None  # (old text, new text, new cursor) for edits done on plain strings
+            if kind == TEXT or key not in [9, curses.KEY_BTAB]:
+                completion = None
+            if kind == TEXT:
+                view.mark(buffer.cursor)
+                buffer.insert(key)
+            elif key in [9, curses.KEY_BTAB]:  # Tab / Shift-Tab: complete the backticked path
+                completer = get_completer(picker_root())
+                step = -1 if key == curses.KEY_BTAB else 1
+                input_str = buffer.text()
+                new_str, cursor_x, completion = complete_backticked_path(input_str, len(prompt) + buffer.cursor, len(prompt), completer, completion, step)
+                edit = (input_str, new_str, cursor_x - len(prompt))
+            elif key in [curses.KEY_BACKSPACE, 127, 8]:  # Handle backspace for different terminals
+                # Delete a character at the cursor position and move cursor left
+                if buffer.delete_before():
+                    view.mark(buffer.cursor)
+            elif key == curses.KEY_DC:
+                if buffer.delete_after():
+                    view.mark(buffer.cursor)
+            elif key == curses.KEY_LEFT:
+                buffer.move_to(buffer.cursor - 1)
+            elif key == curses.KEY_RIGHT:
+                rest = ghost()
+                if rest:
+                    view.mark(buffer.cursor)
+                    buffer.insert(rest)
+                else:
+                    buffer.move_to(buffer.cursor + 1)
+            elif key == curses.KEY_HOME:
+                buffer.move_to(0)
+            elif key == curses.KEY_END:
+                buffer.move_to(len(buffer))
+            elif key in [curses.KEY_DOWN, 16]:
+                # The menus read keys themselves, so hand them whatever was typed ahead
+                push_back_keys(stdscr, events[index + 1 :])
+                view.draw(buffer)
+                if key == curses.KEY_DOWN:
+                    # Open the menu at the top of the working tree
+                    base_path = picker_root()  # Store the base path
+                    selected_option = show_menu(stdscr, cursor_line + 1, 0, base_path, base_path)
+                else:  # Ctrl-P: fuzzy find any path in the repository
+                    selected_option = fuzzy_finder(stdscr, cursor_line + 1, get_path_index(picker_root()))
+                if selected_option:
+                    input_str = buffer.text()
+                    new_str, cursor_x = insert_selected_path(input_str, selected_option, len(prompt) + buffer.cursor, len(prompt))
+                    edit = (input_str, new_str, cursor_x - len(prompt))
+            elif key == 10:  # Enter key
+                # Keys typed past Enter belong to the next prompt
+                reader.push_back(events[index + 1 :])
+                done = True
+
+            if edit is not None and edit[0] != edit[1]:
+                old_str, new_str, cursor = edit
+                view.mark(len(os.path.commonprefix([old_str, new_str])))
+                buffer = GapBuffer(new_str)
+                buffer.move_to(cursor)
+            if done or key in [curses.KEY_DOWN, 16]:
+                break
+
+        # Repaint only what changed and move the cursor; the reader flushes it
+        view.ghost = "" if done else ghost()
+        cursor_line = min(view.draw(buffer), stdscr.getmaxyx()[0] - 1)
+    return buffer.text().strip(), cursor_line
+
+
+# Returns an on_line callback that writes git output into the output pane,
+# turning "\r"-redrawn progress lines into the progress bar
+def line_writer(output):
+    state = {"overwrite": False}
+
+    def on_line(stream, line, overwrite):
+        progress = parse_progress(line)
+        if progress is not None and overwrite:
+            output.set_progress(progress)
+            return
+        output.set_progress(None)
+        if state["overwrite"]:
+            output.replace_last(line)
+        else:
+            output.write("\n" + line)
+        state["overwrite"] = overwrite
+
+    return on_line
+
+
+# Run a git command and stream its output into the output pane
+def run_git_command(output, command):
+    try:
+        returncode = stream_command(command, line_writer(output), on_idle=output.stage)
+    except Exception as e:
+        # Handle other exceptions
+        output.write("\n\nUnexpected error occurred:" + str(e), curses.color_pair(3))
+        return False
+    output.set_progress(None)
+    if returncode != 0:
+        # The error itself was streamed above
+        output.write("\n\nGit command failed: " + " ".join(command) + " exited with status " + str(returncode), curses.color_pair(3))  # Assuming color_pair(3) is for error messages
+        return False
+    return True
+
+
+# Run command on the terminal itself with curses suspended, so that git and
+# ssh can ask for credentials; returns the exit status
+def run_in_terminal(output, command):
+    curses.def_prog_mode()
+    curses.endwin()
+    try:
+        print("\n$ " + " ".join(command), flush=True)
+        try:
+            returncode = subprocess.run(command).returncode
+        except OSError as e:
+            print(str(e))
+            returncode = 1
+        if returncode != 0:
+            input("Press Enter to return to the commit helper.")
+    finally:
+        curses.reset_prog_mode()
+        output.stdscr.clearok(True)  # The terminal holds whatever git printed
+        restore_screen(output.stdscr)
+        output.touch()
+    return returncode
+
+
+# Push on a worker thread while the pane stays live: a status line shows the
+# elapsed time, PageUp/PageDown scroll, and Esc cancels the push. A push that
+# needs a password or passphrase typed in is run again on the terminal.
+def push_in_background(output, command):
+    push = BackgroundPush(command).start()
+    on_line = line_writer(output)
+    while not push.done:
+        for line in push.drain():
+            on_line(*line)
+        if not push.cancelled and output.progress is None:
+            output.set_status("Pushing... %.1fs (Esc to cancel)" % push.elapsed())
+        key = output.getch(timeout=100)
+        if key == 27:
+            push.cancel()
+            output.set_status("Cancelling push...")
+    push.wait()
+    for line in push.drain():
+        on_line(*line)
+    output.set_progress(None)
+    output.set_status(None)
+    if push.state == CANCELLED:
+        output.write("\n\nPush cancelled after %.1fs." % push.elapsed(), curses.color_pair(3))
+        return False
+    if push.error is not None:
+        output.write("\n\nUnexpected error occurred:" + str(push.error), curses.color_pair(3))
+        return False
+    if push.state == FAILED and push.needs_terminal:
+        output.write("\n\nThe push needs credentials; running it on the terminal.", curses.color_pair(5))
+        returncode = run_in_terminal(output, command)
+        if returncode != 0:
+            output.write("\n\nGit command failed: " + " ".join(command) + " exited with status " + str(returncode), curses.color_pair(3))
+            return False
+        return True
+    if push.state == FAILED:
+        output.write("\n\nGit command failed: " + " ".join(command) + " exited with status " + str(push.returncode), curses.color_pair(3))
+        return False
+    return True
+
+
+PANEL_WIDTH = 30
+PANEL_MIN_COLUMNS = 80
+
+
+# Rows of the change summary panel, from whatever the scan has found so far
+def change_summary_lines(scan):
+    lines = [(" Changes" + ("" if scan.done else " ..."), curses.color_pair(5) | curses.A_BOLD)]
+    if scan.staged is None:
+        return lines + [("  reading status", curses.color_pair(6))]
+
+    def diff(stat):
+        return "  +%d -%d" % (stat.insertions, stat.deletions) if stat.files else ""
+
+    lines.append(("  staged    %4d%s" % (scan.staged, diff(scan.staged_lines)), curses.color_pair(2)))
+    lines.append(("  unstaged  %4d%s" % (scan.unstaged, diff(scan.unstaged_lines)), curses.color_pair(1)))
+    lines.append(("  untracked %4d" % scan.untracked, curses.color_pair(6)))
+    if scan.conflicted:
+        lines.append(("  conflicts %4d" % scan.conflicted, curses.color_pair(3)))
+    if scan.capped:
+        lines.append(("  (diff too large, capped)", curses.color_pair(6)))
+    return lines
+
+
+# The main function
+def main(stdscr, prompts, confirmations, defer_push=None, use_daemon=False):
+    # check if the current directory is a git repository
+    if not is_git_repository():
+        raise Exception("Not a git repository")
+    repo = get_repository()
+    # The helper daemon has the status, paths and titles warm; None: work standalone
+    remote = connect_daemon(repo) if use_daemon else None
+    # Refresh the index, read the status and index the paths while the user types
+    prewarm_status(repo, (lambda: remote.status(repo)) if remote is not None else None)
+    prewarm_path_index(repo.worktree, (lambda: remote.prefill_paths(repo)) if remote is not None else None)
+    # Esc cancels a running push; don't wait a second to tell it from a sequence
+    if hasattr(curses, "set_escdelay"):
+        curses.set_escdelay(25)
+    # Initialize colors
+    curses.use_default_colors()
+    if curses.has_colors():
+        curses.start_color()
+        curses.init_pair(1, 3, 8)  # Yellow
+        curses.init_pair(2, 2, 8)  # Green
+        curses.init_pair(3, 1, 8)  # Red
+        curses.init_pair(4, 9, 8)  # Orange
+        curses.init_pair(5, 4, 8)  # Purple
+        curses.init_pair(6, -1, 8)  # White
+        color_pair = curses.color_pair(1)
+    else:
+        raise Exception("Terminal does not support color")
+
+    # Get inputs for all prompts, with a summary of the pending changes on the
+    # side that fills in from a background scan while the user types
+    responses = []
+    y = 0  # Start at the top of the screen
+    scan = ChangeScan(get_repository())
+    guess = CommitTypeGuess(get_repository())
+    history = TitleHistory(repo, (lambda: remote.titles(repo)) if remote is not None else None)
+    panel = SidePanel(stdscr, PANEL_WIDTH, 6) if stdscr.getmaxyx()[1] >= PANEL_MIN_COLUMNS else None
+
+    def present_prompts(window):
+        window.noutrefresh()
+        if panel is not None:
+            panel.set_lines(change_summary_lines(scan))
+            panel.stage()
+        flush()
+
+    def on_idle():
+        # Nothing left to show once the scan is done and on screen
+        if scan.done and panel.lines == change_summary_lines(scan):
+            reader.idle = None
+
+    reader = KeyReader(stdscr, present_prompts, on_idle if panel is not None else None)
+    set_bracketed_paste(True)
+    try:
+        for prompt in prompts:
+            response, new_y = get_input(stdscr, y, prompt, color_pair, True if y == 0 else False, reader, guess, history)
+            if response == "":
+                response = "-"
+            responses.append(response)
+            y += (new_y + 1)  # Move to the next line for the next prompt
+    finally:
+        set_bracketed_paste(False)
+        scan.stop()
+        if panel is not None:
+            panel.close()
+    # Keys typed ahead, e.g. the answer to the commit question
+    push_back_keys(stdscr, reader.pending)
+
+    # Optionally, display all the entered texts after the inputs
+    # stdscr.clear()
+    responses[0] = process_code_string(responses[0], capitalize_mode="all")
+    responses[1] = process_code_string(responses[1])
+    for i, response in enumerate(responses):
+        # Apply green color to the prompt
+        stdscr.attron(curses.color_pair(2))
+        stdscr.addstr(i + y, 0, confirmations[i])
+        stdscr.attroff(curses.color_pair(2))
+
+        # Print the response in the default color
+        stdscr.addstr(response + "\n")
+    # Everything from here on scrolls in the output pane below the confirmations
+    output = OutputPane(stdscr, stdscr.getyx()[0])
+    # Check if user wants to commit the changes
+    output.write("Commit these changes? (y/n): ", curses.color_pair(5))
+
+    terminated = False
+    while True:
+        commit_key = output.getch()
+        if commit_key in [ord("y"), ord("Y")]:
+            # Pick what goes into the commit from one status run, then stage it
+            repo = get_repository()
+            worktree = repo.worktree
+            try:
+                entries = [e for e in current_status(repo) if e.kind != IGNORED]
+            except (OSError, subprocess.CalledProcessError) as e:
+                output.write("\n\nUnexpected error occurred:" + str(e), curses.color_pair(3))
+                return
+            if entries:
+                chosen = staging_picker(stdscr, output.top, entries)
+                output.touch()
+                if chosen is None or not any(chosen):
+                    output.write("\nOperation cancelled by the user.", curses.color_pair(3))
+                    break
+                if not stage_chosen(output, worktree, entries, chosen):
+                    return
+            # Run the git commit command
+            commit_command = ["git", "commit", "-m", responses[0], "-m", responses[1]]
+            result = run_git_command(output, commit_command)
+            # result = True
+            if not result:
+                return
+            output.write("\nChanges committed successfully.", curses.color_pair(2))
+
+            # Now ask for push
+            output.write("\nPush the committed changes? (y/n): ", curses.color_pair(5))
+
+            while True:
+                terminated = True
+                push_key = output.getch()
+                if push_key in [ord("y"), ord("Y")]:
+                    # User wants to push
+                    if defer_push is not None:
+                        # Leave it to the push queue worker, which pushes once commits stop coming
+                        try:
+                            entry = enqueue(get_repository(), defer_push)
+                        except (OSError, ValueError) as e:
+                            output.write("\n\nCould not queue the push: " + str(e), curses.color_pair(3))
+                        else:
+                            output.write("\nPush of %s to %s queued; it runs once no commit has been made for %gs."
+                                         % (entry["commit"][:7], entry["ref"][len("refs/heads/"):], defer_push),
+                                         curses.color_pair(2))
+                        output.write("\nPress Enter to exit.", curses.color_pair(5))
+                        break
+                    # Run the git push command without blocking the screen
+                    result = push_in_background(output, PUSH_COMMAND)
+                    # result = True
+                    if result:
+                        output.write("\nChanges pushed successfully.", curses.color_pair(2))
+                    # The commit stands either way; leave the outcome on screen
+                    output.write("\nPress Enter to exit.", curses.color_pair(5))
+                    break
+                elif push_key in [ord("n"), ord("N")]:
+                    # User does not want to commit
+                    output.write("\nOperation cancelled by the user.", curses.color_pair(3))
+                    break
+                else:
+                    # Invalid key
+                    continue
+        elif commit_key in [ord("n"), ord("N")]:
+            # User does not want to commit
+            output.write("\nOperation cancelled by the user.", curses.color_pair(3))
+            break
+        else:
+            # Invalid key
+            if terminated and (commit_key in [10, 13] or commit_key == curses.KEY_ENTER):
+                break
+            continue
+
+    flush()
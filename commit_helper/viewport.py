@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Windowed view over a list that is longer than the screen.
+#
+# Only indices in visible_range() are ever drawn. Moving the selection inside
+# the window reports just the two rows whose highlight changed; moving it past
+# an edge scrolls the window and asks for a repaint of the visible slice.
+
+
+class Viewport:
+    def __init__(self, total, height):
+        self.total = total
+        self.height = max(1, height)
+        self.selection = 0
+        self.top = 0
+
+    def visible_range(self):
+        return range(self.top, min(self.top + self.height, self.total))
+
+    # Screen row (relative to the window) of an item index
+    def row_of(self, index):
+        return index - self.top
+
+    def resize(self, height):
+        self.height = max(1, height)
+        self._scroll_to(self.selection)
+
+    def _scroll_to(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.height:
+            self.top = index - self.height + 1
+        self.top = max(0, min(self.top, max(self.total - self.height, 0)))
+
+    # Select an item. Returns the item indices to repaint, or None when the
+    # window scrolled and the whole visible slice has to be redrawn.
+    def select(self, index):
+        if self.total == 0:
+            return []
+        index = max(0, min(index, self.total - 1))
+        old_selection, old_top = self.selection, self.top
+        if index == old_selection:
+            return []
+        self.selection = index
+        self._scroll_to(index)
+        if self.top != old_top:
+            return None
+        return [old_selection, index]
+
+    def move(self, delta):
+        return self.select(self.selection + delta)
+
+    # Move a whole window up (-1) or down (1), keeping the selection on the same row
+    def page(self, direction):
+        if self.total == 0:
+            return []
+        row = self.selection - self.top
+        old_top = self.top
+        self.top = max(0, min(self.top + direction * self.height, max(self.total - self.height, 0)))
+        if self.top == old_top:
+            # Already at the first/last page: jump to the first/last item
+            return self.select(0 if direction < 0 else self.total - 1)
+        self.selection = min(self.top + row, self.total - 1)
+        return None
+
+    def home(self):
+        return self.select(0)
+
+    def end(self):
+        return self.select(self.total - 1)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# Directory watcher keeping the picker caches current (Linux inotify).
+#
+# inotify is reached through ctypes and read on one daemon thread that
+# select()s on its file descriptor, so there is no service to run and no
+# dependency. A watch covers the names in one directory: entries created,
+# deleted or moved in and out, and files written. Listeners get every event
+# as (kind, directory, name, is_dir) and pick out the directories they care
+# about:
+#
+#   commit_helper.listing     patches cached listings instead of re-reading
+#                             them, and skips the revalidating stat for
+#                             watched directories
+#   commit_helper.pathindex   adds and removes paths of the fuzzy finder and
+#                             path completion instead of rerunning ls-files
+#
+# watch() returns False when a directory cannot be watched: no inotify on
+# this system, or fs.inotify.max_user_watches is used up. Callers then keep
+# revalidating by mtime as before. OVERFLOW means the kernel dropped events
+# and everything watched must be considered stale. It is also sent once if
+# reading events fails; stopped is set then and watch() returns False.
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK)
+
+# Event kinds passed to listeners
+CREATED = "created"  # Created or moved in
+DELETED = "deleted"  # Deleted or moved out
+WRITTEN = "written"  # A file was written and closed
+GONE = "gone"  # The watched directory itself was deleted or moved
+OVERFLOW = "overflow"  # Events were lost; directory and name are None
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+CHUNK = 64 * 1024
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class DirectoryWatcher:
+    def __init__(self, libc):
+        self._libc = libc
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._paths = {}  # Watch descriptor -> directory
+        self._wds = {}  # Directory -> watch descriptor
+        self._listeners = []
+        self.full = False  # Set once the watch limit was hit
+        self.stopped = False  # Set if reading events failed: no watch reports anything since
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="directory-watcher", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    # Watch the entries of directory; False if it cannot be watched
+    def watch(self, path):
+        if self.stopped:
+            return False
+        if path in self._wds:
+            return True
+        if self.full or os.path.realpath(path) != path:
+            # Events name a directory by one path only: leave aliases to mtimes
+            return False
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() == errno.ENOSPC:
+                self.full = True  # fs.inotify.max_user_watches reached
+            return False
+        with self._lock:
+            self._paths[wd] = path
+            self._wds[path] = wd
+        return True
+
+    def _forget(self, wd):
+        with self._lock:
+            path = self._paths.pop(wd, None)
+            if path is not None and self._wds.get(path) == wd:
+                del self._wds[path]
+
+    # Stop watching directory and everything below it (it moved away) and
+    # tell the listeners each of them is gone. The events of the watches
+    # themselves are not waited for: once the parent reported the move, its
+    # IN_MOVE_SELF would find the watch forgotten already.
+    def _forget_tree(self, path):
+        prefix = path + os.sep
+        with self._lock:
+            gone = [p for p in self._wds if p == path or p.startswith(prefix)]
+        for p in gone:
+            wd = self._wds.get(p)
+            if wd is not None:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._forget(wd)
+            self._dispatch(GONE, p, None, True)
+
+    def _dispatch(self, kind, directory, name, is_dir):
+        for listener in self._listeners:
+            try:
+                listener(kind, directory, name, is_dir)
+            except Exception:
+                pass  # A broken listener must not stop the others being kept fresh
+
+    def _run(self):
+        while True:
+            try:
+                select.select([self._fd], [], [])
+                data = os.read(self._fd, CHUNK)
+            except BlockingIOError:
+                continue
+            except OSError:
+                # Nothing is watched from here on: tell the listeners, as for lost events
+                self.stopped = True
+                self._dispatch(OVERFLOW, None, None, False)
+                return
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self._event(wd, mask, name)
+
+    def _event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            self._dispatch(OVERFLOW, None, None, False)
+            return
+        if mask & IN_IGNORED:
+            self._forget(wd)
+            return
+        directory = self._paths.get(wd)
+        if directory is None:
+            return
+        is_dir = bool(mask & IN_ISDIR)
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            self._forget_tree(directory)
+        elif mask & (IN_CREATE | IN_MOVED_TO):
+            self._dispatch(CREATED, directory, name, is_dir)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            if is_dir:
+                self._forget_tree(os.path.join(directory, name))
+            self._dispatch(DELETED, directory, name, is_dir)
+        elif mask & IN_CLOSE_WRITE:
+            self._dispatch(WRITTEN, directory, name, is_dir)
+
+
+# Does an event (directory and name as passed to listeners) concern the
+# working tree at worktree, outside .git? Lost events concern everything.
+def in_worktree(worktree, directory, name):
+    if directory is None:
+        return True
+    if directory == worktree:
+        return name != ".git"
+    return directory.startswith(worktree + os.sep) and not directory.startswith(os.path.join(worktree, ".git", ""))
+
+
+_WATCHER = None
+_STARTED = False
+_START_LOCK = threading.Lock()
+
+
+# The process-wide watcher, started on first use; None without inotify or
+# with COMMIT_HELPER_NO_WATCH set
+def get_watcher():
+    global _WATCHER, _STARTED
+    with _START_LOCK:
+        if not _STARTED:
+            _STARTED = True
+            libc = None if os.environ.get("COMMIT_HELPER_NO_WATCH") else _load_libc()
+            if libc is not None:
+                try:
+                    _WATCHER = DirectoryWatcher(libc)
+                except OSError:
+                    pass
+    return _WATCHER
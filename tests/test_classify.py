@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# The commit type preselected for a change set.
+
+import unittest
+
+from commit_helper.classify import classify_changes
+from commit_helper.formatting import find_commit_type
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_docs(self):
+        docs = find_commit_type("Add Documentation")
+        self.assertEqual(classify_changes([("M", "guide.md"), ("A", "docs/notes.txt")]), docs)
+        self.assertEqual(classify_changes([("M", "src/docs/api.txt")]), docs)
+
+    def test_txt_outside_docs(self):
+        update = find_commit_type("Update")
+        self.assertEqual(classify_changes([("M", "requirements.txt")]), update)
+        self.assertEqual(classify_changes([("M", "CMakeLists.txt"), ("M", "README.md")]), update)
+
+
+if __name__ == "__main__":
+    unittest.main()
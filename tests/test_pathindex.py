@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# An index patched with changes searches like one built from the new paths,
+# across blob boundaries and blobs that empty or split.
+
+import random
+import unittest
+from unittest import mock
+
+from commit_helper import pathindex
+from commit_helper.pathindex import PathIndex
+
+QUERIES = ["", "a", "ab", "b/a", "readme", "x1", "c/d", "zz"]
+
+
+def random_paths(rng, count):
+    parts = ["a", "b", "c", "d", "ab", "readme", "x1", "src"]
+    return {"/".join(rng.choice(parts) for _ in range(rng.randint(1, 4))) + str(rng.randint(0, 99))
+            for _ in range(count)}
+
+
+class PathIndexTest(unittest.TestCase):
+    def test_ranked(self):
+        index = PathIndex(["src/readme.md", "readme.md", "docs/x/readme", "a/b"])
+        self.assertEqual(index.search("readme"), ["readme.md", "docs/x/readme", "src/readme.md"])
+        self.assertEqual(index.search("ab"), ["a/b"])
+        self.assertEqual(len(index), 4)
+
+    @mock.patch.object(pathindex, "CHUNK", 4)
+    def test_update_matches_rebuild(self):
+        rng = random.Random(7)
+        paths = random_paths(rng, 60)
+        index = PathIndex(paths)
+        for _ in range(40):
+            removed = set(rng.sample(sorted(paths), min(len(paths), rng.randint(0, 15))))
+            added = random_paths(rng, rng.randint(0, 15)) - paths
+            index.search(rng.choice(QUERIES))  # Leaves a narrowed scope behind
+            index.update(added, removed)
+            paths = (paths | added) - removed
+            fresh = PathIndex(paths)
+            self.assertEqual(len(index), len(paths))
+            for query in QUERIES:
+                self.assertEqual(index.search(query, 1000), fresh.search(query, 1000), query)
+
+    def test_repeated_changes(self):
+        index = PathIndex(["a", "b"])
+        index.update({"a", "c"}, {"d"})
+        self.assertEqual(index.search("", 10), ["a", "b", "c"])
+        index.update(set(), {"a", "b", "c"})
+        self.assertEqual(index.search("a"), [])
+        index.update({"e"}, set())
+        self.assertEqual(index.search(""), ["e"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# BackgroundPush against a local bare repository as the remote.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from commit_helper.push import CANCELLED, FAILED, PUSHED, BackgroundPush
+
+
+def git(cwd, *args):
+    return subprocess.run(["git"] + list(args), cwd=cwd, check=True, stdin=subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True).stdout.strip()
+
+
+def identify(cwd):
+    for key, value in (("user.name", "Test"), ("user.email", "test@example.com"), ("commit.gpgsign", "false")):
+        git(cwd, "config", key, value)
+
+
+def commit(cwd, name):
+    with open(os.path.join(cwd, name), "w") as f:
+        f.write(name + "\n")
+    git(cwd, "add", name)
+    git(cwd, "commit", "-q", "-m", name)
+
+
+class BackgroundPushTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmp, "remote.git")
+        self.work = os.path.join(self.tmp, "work")
+        git(self.tmp, "init", "-q", "--bare", self.remote)
+        git(self.tmp, "init", "-q", self.work)
+        identify(self.work)
+        git(self.work, "remote", "add", "origin", self.remote)
+        commit(self.work, "first")
+        git(self.work, "push", "-q", "-u", "origin", "HEAD")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def push(self):
+        return BackgroundPush(["git", "push", "--progress"], cwd=self.work).start()
+
+    def test_pushed(self):
+        commit(self.work, "second")
+        push = self.push()
+        self.assertEqual(push.wait(30), PUSHED)
+        self.assertEqual(push.returncode, 0)
+        self.assertEqual(git(self.remote, "rev-parse", "HEAD"), git(self.work, "rev-parse", "HEAD"))
+
+    def test_rejected_non_fast_forward(self):
+        other = os.path.join(self.tmp, "other")
+        git(self.tmp, "clone", "-q", self.remote, other)
+        identify(other)
+        commit(other, "theirs")
+        git(other, "push", "-q")
+        commit(self.work, "ours")
+        push = self.push()
+        self.assertEqual(push.wait(30), FAILED)
+        self.assertNotEqual(push.returncode, 0)
+        self.assertTrue(any("rejected" in line for _, line, _ in push.drain()))
+
+    def test_cancelled(self):
+        hook = os.path.join(self.remote, "hooks", "pre-receive")
+        with open(hook, "w") as f:
+            f.write("#!/bin/sh\nsleep 30\n")
+        os.chmod(hook, 0o755)
+        commit(self.work, "second")
+        tip = git(self.remote, "rev-parse", "HEAD")
+        push = self.push()
+        time.sleep(0.5)  # Let it reach the hook
+        started = time.monotonic()
+        push.cancel()
+        self.assertEqual(push.wait(10), CANCELLED)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(git(self.remote, "rev-parse", "HEAD"), tip)
+
+    def test_needs_terminal(self):
+        # What git prints when it would have asked for a password
+        script = ("import os, sys; assert os.environ['GIT_TERMINAL_PROMPT'] == '0'; "
+                  "sys.stderr.write(\"fatal: could not read Username for 'https://example.com': "
+                  "terminal prompts disabled\\n\"); sys.exit(128)")
+        push = BackgroundPush([sys.executable, "-c", script], cwd=self.work).start()
+        self.assertEqual(push.wait(30), FAILED)
+        self.assertTrue(push.needs_terminal)
+
+    def test_rejected_does_not_need_terminal(self):
+        hook = os.path.join(self.remote, "hooks", "pre-receive")
+        with open(hook, "w") as f:
+            f.write("#!/bin/sh\nexit 1\n")
+        os.chmod(hook, 0o755)
+        commit(self.work, "second")
+        push = self.push()
+        self.assertEqual(push.wait(30), FAILED)
+        self.assertFalse(push.needs_terminal)
+
+
+if __name__ == "__main__":
+    unittest.main()
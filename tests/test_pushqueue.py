@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Deferred pushes go where a plain git push would have gone at queue time.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from commit_helper import pushqueue
+from commit_helper.repo import discover_repository
+
+
+def git(cwd, *args):
+    return subprocess.run(["git"] + list(args), cwd=cwd, check=True, stdin=subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True).stdout.strip()
+
+
+def commit(cwd, name):
+    with open(os.path.join(cwd, name), "w") as f:
+        f.write(name + "\n")
+    git(cwd, "add", name)
+    git(cwd, "commit", "-q", "-m", name)
+    return git(cwd, "rev-parse", "HEAD")
+
+
+class PushQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.remote = os.path.join(self.tmp, "remote.git")
+        self.work = os.path.join(self.tmp, "work")
+        git(self.tmp, "init", "-q", "--bare", self.remote)
+        git(self.tmp, "init", "-q", "-b", "main", self.work)
+        for key, value in (("user.name", "Test"), ("user.email", "test@example.com"), ("commit.gpgsign", "false")):
+            git(self.work, "config", key, value)
+        git(self.work, "remote", "add", "origin", self.remote)
+        commit(self.work, "first")
+        git(self.work, "push", "-q", "-u", "origin", "main")
+        self.repo = discover_repository(self.work)
+        patcher = mock.patch.object(pushqueue, "ensure_worker")  # The test runs the worker itself
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_branch_switch_during_idle_window(self):
+        queued = commit(self.work, "second")
+        entry = pushqueue.enqueue(self.repo, 0)
+        self.assertEqual((entry["branch"], entry["remote"], entry["ref"]), ("refs/heads/main", "origin", "refs/heads/main"))
+        git(self.work, "checkout", "-q", "-b", "topic")
+        commit(self.work, "topic")
+        self.assertEqual(pushqueue.run_worker(self.repo.common_dir, wait=False), 0)
+        self.assertEqual(git(self.remote, "rev-parse", "refs/heads/main"), queued)
+        self.assertNotIn("refs/heads/topic", git(self.remote, "for-each-ref", "--format=%(refname)"))
+        self.assertEqual(pushqueue.read_queue(self.repo.common_dir), [])
+
+    def test_coalesces_per_destination(self):
+        commit(self.work, "second")
+        pushqueue.enqueue(self.repo, 0)
+        newest = commit(self.work, "third")
+        pushqueue.enqueue(self.repo, 0)
+        with mock.patch.object(pushqueue, "_push", wraps=pushqueue._push) as push:
+            pushqueue.run_worker(self.repo.common_dir, wait=False)
+        self.assertEqual(push.call_count, 1)
+        self.assertEqual(git(self.remote, "rev-parse", "refs/heads/main"), newest)
+
+    def test_no_destination(self):
+        git(self.work, "checkout", "-q", "-b", "topic")
+        commit(self.work, "topic")
+        with self.assertRaises(ValueError):
+            pushqueue.enqueue(self.repo, 0)
+        git(self.work, "config", "push.default", "current")
+        self.assertEqual(pushqueue.push_target(self.work), ("refs/heads/topic", "origin", "refs/heads/topic"))
+        git(self.work, "checkout", "-q", "--detach")
+        with self.assertRaises(ValueError):
+            pushqueue.push_target(self.work)
+
+
+if __name__ == "__main__":
+    unittest.main()
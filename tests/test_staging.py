@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Staging the files ticked in the staging picker.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from commit_helper.status import RENAMED, read_status
+from commit_helper.ui import stage_chosen
+
+
+def git(cwd, *args):
+    return subprocess.run(["git"] + list(args), cwd=cwd, check=True, stdin=subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True).stdout
+
+
+class Output:
+    def __init__(self):
+        self.text = ""
+
+    def write(self, text, attr=0):
+        self.text += text
+
+
+class StageChosenTest(unittest.TestCase):
+    def setUp(self):
+        self.work = os.path.realpath(tempfile.mkdtemp())
+        git(self.work, "init", "-q")
+        for key, value in (("user.name", "Test"), ("user.email", "test@example.com"), ("commit.gpgsign", "false")):
+            git(self.work, "config", key, value)
+        for name in ("a", "b", "c", "d"):
+            with open(os.path.join(self.work, name), "w") as f:
+                f.write(name + "\n")
+        git(self.work, "add", ".")
+        git(self.work, "commit", "-q", "-m", "first")
+
+    def tearDown(self):
+        shutil.rmtree(self.work)
+
+    def test_staged_delete_and_renames(self):
+        git(self.work, "rm", "-q", "a")
+        git(self.work, "mv", "b", "b2")
+        git(self.work, "mv", "d", "d2")
+        with open(os.path.join(self.work, "c"), "a") as f:
+            f.write("x\n")
+        open(os.path.join(self.work, "n"), "w").close()
+        entries = read_status(self.work)
+        # Everything but the rename of d
+        chosen = [not (e.kind == RENAMED and e.path == "d2") for e in entries]
+        output = Output()
+        self.assertTrue(stage_chosen(output, self.work, entries, chosen), output.text)
+        staged = git(self.work, "diff", "--cached", "--name-status", "-M").splitlines()
+        self.assertEqual(sorted(staged), ["A\tn", "D\ta", "M\tc", "R100\tb\tb2"])
+        self.assertEqual(git(self.work, "status", "--porcelain", "--", "d", "d2").splitlines(), [" D d", "?? d2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Importing the entry point stays within the startup budget and loads none
+# of the modules that are only needed once the arguments are known.
+
+import unittest
+
+from commit_helper.bench import ENTRY_MODULE, LAZY_MODULES, STARTUP_BUDGET_MS, check_startup, import_time
+
+
+class StartupTest(unittest.TestCase):
+    def test_budget(self):
+        ok, ms, eager = check_startup()
+        self.assertTrue(ok, "import %s: %.1f ms (budget %.1f ms), imported eagerly: %s"
+                        % (ENTRY_MODULE, ms, STARTUP_BUDGET_MS, ", ".join(eager) or "nothing"))
+
+    def test_no_lazy_modules(self):
+        _, loaded = import_time(ENTRY_MODULE)
+        self.assertEqual([name for name in LAZY_MODULES if name in loaded], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
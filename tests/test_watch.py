@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# A watcher whose thread cannot read events any more says so, and the path
+# list stops counting on its watches.
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from commit_helper import pathindex, watch
+from commit_helper.watch import OVERFLOW, DirectoryWatcher
+
+
+@unittest.skipIf(watch._load_libc() is None, "no inotify")
+class StoppedWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+        os.mkdir(os.path.join(self.tmp, "sub"))
+        with open(os.path.join(self.tmp, "sub", "f"), "w"):
+            pass
+        self.watcher = DirectoryWatcher(watch._load_libc())
+        self.events = []
+        self.overflow = threading.Event()
+
+    def listener(self, kind, directory, name, is_dir):
+        self.events.append(kind)
+        if kind == OVERFLOW:
+            self.overflow.set()
+
+    # Make the next read of events fail, and wake the watcher thread up for it
+    def break_watcher(self):
+        fd = os.open(self.tmp, os.O_RDONLY)
+        os.dup2(fd, self.watcher._fd)  # Reading a directory raises IsADirectoryError
+        os.close(fd)
+        with open(os.path.join(self.tmp, "wake"), "w"):
+            pass
+        self.assertTrue(self.overflow.wait(5))
+
+    def test_overflow_and_stopped(self):
+        self.watcher.subscribe(self.listener)
+        self.assertTrue(self.watcher.watch(self.tmp))
+        self.break_watcher()
+        self.assertTrue(self.watcher.stopped)
+        self.assertEqual(self.events, [OVERFLOW])
+        self.assertFalse(self.watcher.watch(self.tmp))
+
+    def test_not_fully_watched(self):
+        with mock.patch.object(pathindex, "get_watcher", return_value=self.watcher):
+            paths = pathindex.RepoPaths(self.tmp, ["sub/f"])
+            paths._watching.join()
+            self.assertTrue(paths.fully_watched())
+            self.watcher.subscribe(self.listener)
+            self.break_watcher()
+            self.assertFalse(paths.fully_watched())
+            with mock.patch.object(pathindex, "load_repo_paths", return_value=["sub/f"]):
+                self.assertTrue(paths.sync())
+            paths._watching.join()
+            self.assertEqual(sorted(paths._unwatched), ["", "sub"])
+
+
+if __name__ == "__main__":
+    unittest.main()